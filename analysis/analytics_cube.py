@@ -0,0 +1,283 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+# Directory holding the cube tables, written next to the analytics artifact
+CUBE_PATH = "analytics_cube"
+
+# Minimum salaries are grouped into bands of this width, with one open band at the top
+SALARY_BAND_WIDTH = 10000
+MAX_SALARY_BAND = 150000
+UNKNOWN_SALARY_BAND = -1
+
+# Dimensions every cube cell is keyed by
+DIMENSIONS = ['location', 'salary_band', 'week']
+
+
+def salary_band(salaries):
+    """Returns the lower bound of the salary band of each salary, UNKNOWN_SALARY_BAND if missing."""
+    bands = (np.floor(salaries / SALARY_BAND_WIDTH) * SALARY_BAND_WIDTH).clip(upper=MAX_SALARY_BAND)
+    return bands.fillna(UNKNOWN_SALARY_BAND).astype('int64')
+
+
+def salary_band_label(band):
+    """Display label of a salary band, e.g. '£30k-£40k'."""
+    if band == UNKNOWN_SALARY_BAND:
+        return "Unknown"
+    if band >= MAX_SALARY_BAND:
+        return f"£{band // 1000}k+"
+    return f"£{band // 1000}k-£{(band + SALARY_BAND_WIDTH) // 1000}k"
+
+
+def listing_dimensions(data_engineer_df):
+    """
+    Computes the cube dimensions of each listing.
+
+    Returns:
+        pd.DataFrame: 'location', 'salary_band', 'week' (the Monday starting the week the
+        listing was created, as 'YYYY-MM-DD') and 'salary' columns, in the frame's row order.
+    """
+    created = pd.to_datetime(data_engineer_df['created'])
+    return pd.DataFrame({
+        'location': data_engineer_df['location'].astype(object).to_numpy(),
+        'salary_band': salary_band(data_engineer_df['salary_min'].astype(float)).to_numpy(),
+        'week': created.dt.to_period('W-SUN').dt.start_time.dt.strftime('%Y-%m-%d').to_numpy(),
+        'salary': data_engineer_df['salary_min'].astype(float).to_numpy(),
+    })
+
+
+def _aggregate(frame, keys, **extra):
+    # Count, sum, min and max of minimum salary for every cell, missing locations kept as a cell
+    return (
+        frame.groupby(keys, dropna=False)
+        .agg(
+            **extra,
+            salary_count=('salary', 'count'),
+            salary_sum=('salary', 'sum'),
+            salary_lowest=('salary', 'min'),
+            salary_highest=('salary', 'max'),
+        )
+        .reset_index()
+    )
+
+
+def filter_mask(cells, locations=None, salary_range=None, week_range=None):
+    """
+    Selects rows of a frame with cube dimension columns.
+
+    Parameters:
+    -----------
+    cells : pd.DataFrame
+        Frame with 'location', 'salary_band' and 'week' columns
+
+    locations=None : list of str
+        Keep only these locations, all locations if None or empty
+
+    salary_range=None : tuple of int
+        Lowest and highest salary band to keep, every band including unknown salaries if None
+
+    week_range=None : tuple of str
+        First and last week to keep, as 'YYYY-MM-DD', every week if None
+
+    Returns:
+    --------
+    np.ndarray
+        Boolean mask, one value per row
+    """
+    mask = np.ones(len(cells), dtype=bool)
+    if locations:
+        mask &= cells['location'].isin(locations).to_numpy()
+    if salary_range is not None:
+        mask &= cells['salary_band'].between(*salary_range).to_numpy()
+    if week_range is not None:
+        mask &= cells['week'].between(*week_range).to_numpy()
+    return mask
+
+
+def listing_mask(data_engineer_df, locations=None, salary_range=None, week_range=None):
+    """Applies the cube filters to individual listings, e.g. to mask rows of a SkillMatrix."""
+    return filter_mask(listing_dimensions(data_engineer_df), locations, salary_range, week_range)
+
+
+class AnalyticsCube:
+    """
+    Pre-aggregated listing counts and minimum salary statistics for dashboard cross-filtering.
+
+    The cube has two tables of cells keyed by location, salary band and week:
+    `listings` counts every listing once, `skills` adds category and skill and counts only
+    listings mentioning the skill. Listings mention many skills, so totals over listings
+    always come from `listings`. Every query filters and rolls up cells, whose number depends
+    on locations, bands, weeks and skills but not on the number of listings.
+
+    Parameters:
+    -----------
+    listings : pd.DataFrame
+        Cells with listing_count and salary_count, salary_sum, salary_lowest, salary_highest
+
+    skills : pd.DataFrame
+        Cells with category, skill, listing_count, mention_count and the salary statistics
+
+    locations : pd.DataFrame
+        'location', 'lat' and 'lon' of each location
+    """
+
+    def __init__(self, listings, skills, locations):
+        self.listings = listings
+        self.skills = skills
+        self.locations = locations
+
+    def weeks(self):
+        """Every week in the cube, in order."""
+        return sorted(self.listings['week'].dropna().unique())
+
+    def salary_bands(self):
+        """Every known salary band in the cube, in order."""
+        return sorted(band for band in self.listings['salary_band'].unique() if band != UNKNOWN_SALARY_BAND)
+
+    def location_names(self):
+        """Every location in the cube, in order."""
+        return sorted(self.listings['location'].dropna().unique())
+
+    def cells(self, category=None, skill=None, **filters):
+        """
+        Cells matching the filters, restricted to listings mentioning `skill` if given.
+
+        Filters are the keyword arguments of `filter_mask`.
+        """
+        cells = self.listings
+        if skill is not None:
+            cells = self.skills[(self.skills['category'] == category) & (self.skills['skill'] == skill)]
+        return cells[filter_mask(cells, **filters)]
+
+    def salary_by_location(self, category=None, skill=None, **filters):
+        """
+        Average minimum salary and number of salaried listings for each location.
+
+        Returns:
+            pd.DataFrame: 'location', 'salary_min_mean', 'lat', 'lon' and 'job_count' columns.
+        """
+        rollup = self.cells(category, skill, **filters).groupby('location')[['salary_sum', 'salary_count']].sum()
+        rollup = rollup[rollup['salary_count'] > 0]
+        return pd.DataFrame({
+            'location': rollup.index,
+            'salary_min_mean': (rollup['salary_sum'] / rollup['salary_count']).to_numpy(),
+            'job_count': rollup['salary_count'].astype(int).to_numpy(),
+        }).merge(self.locations, on='location', how='left')
+
+    def salary_band_counts(self, category=None, skill=None, **filters):
+        """Number of listings in each known salary band, in band order."""
+        cells = self.cells(category, skill, **filters)
+        counts = cells[cells['salary_band'] != UNKNOWN_SALARY_BAND].groupby('salary_band')['listing_count'].sum()
+        return counts.sort_index()
+
+    def location_counts(self, category=None, skill=None, **filters):
+        """
+        Number of listings at each location, with its coordinates, most listings first.
+
+        Returns:
+            pd.DataFrame: 'location', 'count', 'lat' and 'lon' columns.
+        """
+        counts = self.cells(category, skill, **filters).groupby('location')['listing_count'].sum()
+        counts = counts[counts > 0].sort_values(ascending=False)
+        return (
+            pd.DataFrame({'location': counts.index, 'count': counts.astype(int).to_numpy()})
+            .merge(self.locations, on='location', how='left')
+        )
+
+    def skill_counts(self, category, **filters):
+        """Total mentions of each skill in a category, keyed by skill, most mentioned first."""
+        cells = self.skills[self.skills['category'] == category]
+        counts = cells[filter_mask(cells, **filters)].groupby('skill')['mention_count'].sum()
+        return {skill: int(count) for skill, count in counts.sort_values(ascending=False).items() if count}
+
+    def skill_breakdown(self, category, **filters):
+        """Mentions of each skill in a category per location, as a locations x skills frame."""
+        cells = self.skills[self.skills['category'] == category]
+        return (
+            cells[filter_mask(cells, **filters)]
+            .pivot_table(index='location', columns='skill', values='mention_count', aggfunc='sum', fill_value=0)
+        )
+
+
+def build_cube(data_engineer_df, skill_matrices):
+    """
+    Builds the analytics cube from listings and the skill matrices built over them.
+
+    Parameters:
+    -----------
+    data_engineer_df : pd.DataFrame
+        Listings with location, salary_min, created, lat and lon columns, in the same row
+        order as the skill matrices
+
+    skill_matrices : dict
+        SkillMatrix for each category, from `skill_matrix.build_skill_matrices`
+
+    Returns:
+    --------
+    AnalyticsCube
+    """
+    dimensions = listing_dimensions(data_engineer_df)
+    listings = _aggregate(dimensions, DIMENSIONS, listing_count=('salary', 'size'))
+
+    # One row per non-zero matrix entry, carrying the dimensions of its listing
+    skill_frames = []
+    for category, skill_matrix in skill_matrices.items():
+        entries = skill_matrix.matrix.tocoo()
+        frame = dimensions.iloc[entries.row].reset_index(drop=True)
+        frame['category'] = category
+        frame['skill'] = np.asarray(skill_matrix.skills, dtype=object)[entries.col]
+        frame['mentions'] = entries.data
+        skill_frames.append(frame)
+
+    skills = _aggregate(
+        pd.concat(skill_frames, ignore_index=True),
+        DIMENSIONS + ['category', 'skill'],
+        listing_count=('mentions', 'size'),
+        mention_count=('mentions', 'sum'),
+    )
+
+    locations = (
+        data_engineer_df.astype({'location': object})
+        .groupby('location')
+        .agg(lat=('lat', 'first'), lon=('lon', 'first'))
+        .reset_index()
+    )
+    return AnalyticsCube(listings, skills, locations)
+
+
+def save_cube(cube, source_hash, cube_path=CUBE_PATH):
+    """Writes the cube tables as Parquet files, with the source data hash they were built from."""
+    os.makedirs(cube_path, exist_ok=True)
+    for name in ('listings', 'skills', 'locations'):
+        getattr(cube, name).to_parquet(os.path.join(cube_path, f"{name}.parquet"), engine='pyarrow', index=False)
+
+    with open(os.path.join(cube_path, "cube.json"), "w") as file:
+        json.dump({'source_hash': source_hash}, file)
+    print(f"Analytics cube written to '{cube_path}' ({len(cube.listings)} listing cells, {len(cube.skills)} skill cells).")
+
+
+def load_cube(cube_path=CUBE_PATH, source_hash=None):
+    """
+    Loads a cube written by `save_cube`.
+
+    Returns:
+        AnalyticsCube or None: None if the cube is missing or was built from other data.
+    """
+    try:
+        with open(os.path.join(cube_path, "cube.json"), "r") as file:
+            if source_hash and json.load(file).get('source_hash') != source_hash:
+                return None
+
+        tables = {
+            name: pd.read_parquet(os.path.join(cube_path, f"{name}.parquet"), engine='pyarrow')
+            for name in ('listings', 'skills', 'locations')
+        }
+    except (FileNotFoundError, ValueError):
+        return None
+    return AnalyticsCube(**tables)
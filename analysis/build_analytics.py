@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from analysis import description_analysis as da
+from analysis import dataset_export
+from analysis import skill_matrix as sm
+from analysis import analytics_cube as ac
+from common import metrics
+from analysis.resources.technologies import tech
+from analysis.resources.non_tech_skills import non_tech_skills
+
+
+# Bump when the artifact contents change so older artifacts are rebuilt
+ANALYTICS_VERSION = 2
+
+# Precomputed artifact built from the dashboard data
+ARTIFACT_PATH = "analytics_artifact.json"
+
+# Only columns needed to build the analytics are loaded
+ANALYTICS_COLUMNS = ['id', 'description', 'location', 'salary_min', 'created', 'lat', 'lon', 'cluster_id']
+
+
+def build_analytics(data_engineer_df, skill_totals=None):
+    """
+    Computes every aggregate the dashboard displays from the cleaned job data.
+
+    Descriptions are tokenised once, one at a time, and counted against both the
+    technology and professional skill lists in the same pass. When listings carry a
+    'cluster_id', only one representative per near-duplicate cluster is counted.
+
+    Parameters:
+    -----------
+    data_engineer_df : pd.DataFrame
+        Cleaned job listings with description, location, salary_min, lat and lon columns
+
+    skill_totals=None : tuple of dict
+        Optional precomputed (tech_count, skill_count), e.g. rolled up from the job_skill_counts
+        table, in which case descriptions are not tokenised at all
+
+    Returns:
+    --------
+    dict
+        JSON-serialisable analytics with keys 'tech_count', 'skill_count', 'salary_by_location',
+        'top_locations', 'location_counts' and 'stats'
+    """
+    # Reposted copies of the same role would skew counts and salaries
+    data_engineer_df = dataset_export.select_representatives(data_engineer_df)
+
+    if skill_totals is not None:
+        tech_count, skill_count = (Counter(totals) for totals in skill_totals)
+    else:
+        # Count technologies and professional skills in a single pass over the descriptions
+        tech_trie = da.compile_word_category(tuple(tech))
+        skill_trie = da.compile_word_category(tuple(non_tech_skills))
+        tech_count = Counter()
+        skill_count = Counter()
+        documents = 0
+        for tokens in da.iter_document_tokens(data_engineer_df):
+            tech_trie.count(tokens, tech_count)
+            skill_trie.count(tokens, skill_count)
+            documents += 1
+        metrics.increment("documents_processed_total", documents)
+
+    # Average minimum salary and count of listings by location
+    salary_by_location = (
+        data_engineer_df.groupby('location', observed=True)
+        .agg(
+            salary_min_mean=('salary_min', 'mean'),
+            lat=('lat', 'first'),
+            lon=('lon', 'first'),
+            job_count=('salary_min', 'count')
+        )
+        .reset_index()
+    )
+
+    # Number of listings at each mapped coordinate
+    location_counts = (
+        data_engineer_df.groupby(['lat', 'lon'])
+        .agg(count=('lat', 'size'), location=('location', 'first'))
+        .reset_index()
+    )
+
+    top_locations = data_engineer_df['location'].value_counts().head(10)
+    top_locations.index = top_locations.index.astype(str)
+
+    stats = {
+        'total_job_listings': int(data_engineer_df['id'].nunique()),
+        'avg_salary': round(data_engineer_df['salary_min'].mean()),
+        'most_common_tech': max(tech_count, key=tech_count.get) if tech_count else None,
+    }
+
+    return {
+        'tech_count': dict(tech_count),
+        'skill_count': dict(skill_count),
+        'salary_by_location': salary_by_location.astype({'location': str}).to_dict(orient='records'),
+        'top_locations': top_locations.to_dict(),
+        'location_counts': location_counts.astype({'location': str}).to_dict(orient='records'),
+        'stats': stats,
+    }
+
+
+def write_analytics_artifact(artifact_path=ARTIFACT_PATH, skill_counts_from_database=False):
+    """
+    Builds analytics from the dashboard data and writes them to a versioned JSON artifact.
+
+    The artifact records the hash of the source data, so it can be ignored once the data changes.
+    Descriptions are tokenised into sparse jobs x skills matrices, saved alongside the artifact
+    for filtered skill counts, and the overall counts are summed from them. The location x
+    skill x salary band x week cube used for cross-filtering is built from the same matrices.
+    With `skill_counts_from_database`, skill counts are instead rolled up from the incrementally
+    maintained job_skill_counts table and neither the matrices nor the cube are written.
+
+    Returns:
+    --------
+    dict
+        The artifact that was written
+    """
+    skill_totals = None
+    columns = ANALYTICS_COLUMNS
+    if skill_counts_from_database:
+        # Imported here so building from files does not need a database connection
+        from analysis.skill_counts import create_skill_count_tables, load_skill_totals, update_job_skill_counts
+        create_skill_count_tables()
+        update_job_skill_counts()
+        skill_totals = (load_skill_totals('tech'), load_skill_totals('professional'))
+        columns = [column for column in ANALYTICS_COLUMNS if column != 'description']
+
+    source_hash = dataset_export.source_hash()
+    data_engineer_df = dataset_export.load_dataset(columns)
+
+    if skill_totals is None:
+        # Matrices cover the same representative listings build_analytics counts
+        representatives_df = dataset_export.select_representatives(data_engineer_df)
+        matrices = sm.build_skill_matrices(representatives_df, {'tech': tech, 'professional': non_tech_skills})
+        metrics.increment("documents_processed_total", int(representatives_df['description'].notna().sum()))
+        sm.save_skill_matrices(matrices, source_hash)
+        ac.save_cube(ac.build_cube(representatives_df, matrices), source_hash)
+        skill_totals = (matrices['tech'].counts(), matrices['professional'].counts())
+
+    artifact = {
+        'version': ANALYTICS_VERSION,
+        'source_hash': source_hash,
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        **build_analytics(data_engineer_df, skill_totals),
+    }
+
+    with open(artifact_path, "w") as file:
+        json.dump(artifact, file, default=float)
+
+    print(f"Analytics artifact written to '{artifact_path}'.")
+    return artifact
+
+
+def load_analytics_artifact(artifact_path=ARTIFACT_PATH, source_hash=None):
+    """
+    Loads a previously built analytics artifact.
+
+    Parameters:
+    -----------
+    artifact_path=ARTIFACT_PATH : str
+        Path to the JSON artifact
+
+    source_hash=None : str
+        Hash of the current source data, if given the artifact must have been built from it
+
+    Returns:
+    --------
+    dict or None
+        The artifact, or None if it is missing, from an older version or built from other data
+    """
+    try:
+        with open(artifact_path, "r") as file:
+            artifact = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if artifact.get('version') != ANALYTICS_VERSION:
+        return None
+    if source_hash and artifact.get('source_hash') != source_hash:
+        return None
+    return artifact
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the dashboard analytics artifact.")
+    parser.add_argument(
+        "--skill-counts-from-database", action="store_true",
+        help="Roll skill counts up from the job_skill_counts table instead of tokenising descriptions"
+    )
+    args = parser.parse_args()
+
+    try:
+        with metrics.stage("build_analytics"):
+            write_analytics_artifact(skill_counts_from_database=args.skill_counts_from_database)
+    finally:
+        metrics.flush()
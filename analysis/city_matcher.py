@@ -0,0 +1,59 @@
+import re
+
+from analysis.resources.city_mapping import city_map, non_uk_locations
+
+
+def compile_city_pattern(location_map):
+    """
+    Compiles the keys of a location mapping into a single alternation regex.
+
+    Keys only match on word boundaries, so "bury" does not match inside "canterbury".
+    Longer keys are placed first so the longest key starting at a position is preferred.
+
+    Parameters:
+    -----------
+    location_map : dict
+        Mapping of lowercase location names to their cleaned names
+
+    Returns:
+    --------
+    re.Pattern
+        Compiled pattern capturing the matched key
+    """
+    keys = sorted(location_map, key=len, reverse=True)
+    alternation = '|'.join(re.escape(key) for key in keys)
+    return re.compile(rf'(?<!\w)({alternation})(?!\w)')
+
+
+# City keys plus known non-UK places, so "new york" wins over "york" and maps to None
+LOCATION_MAP = {**city_map, **non_uk_locations}
+CITY_PATTERN = compile_city_pattern(LOCATION_MAP)
+
+
+def _longest_match(matches):
+    # Map the longest matched key to its cleaned city name, None if nothing matched
+    if not matches:
+        return None
+    return LOCATION_MAP[max(matches, key=len)]
+
+
+def map_city(location):
+    """Return the cleaned city name for a single lowercase location string, or None."""
+    return _longest_match(CITY_PATTERN.findall(location))
+
+
+def match_cities(locations):
+    """
+    Maps a whole Series of lowercase location strings to cleaned city names.
+
+    Parameters:
+    -----------
+    locations : pd.Series
+        Lowercase location strings
+
+    Returns:
+    --------
+    pd.Series
+        Cleaned city names aligned with `locations`, None where no city matched
+    """
+    return locations.str.findall(CITY_PATTERN).map(_longest_match, na_action='ignore')
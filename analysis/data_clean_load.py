@@ -1,19 +1,17 @@
 import sys
 import os
-from sqlalchemy import create_engine
 import pandas as pd
-from dotenv import load_dotenv
-import psycopg2
-from opencage.geocoder import OpenCageGeocode
+from psycopg2.extras import execute_values
 import time
 
-# Import dictionary of cities from another file
+# Import compiled city matcher from another file
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from analysis.resources.city_mapping import city_map
-from analysis.resources.config import DB_CONFIG
+from analysis.city_matcher import match_cities
+from common import metrics
+from common.db import get_connection, get_engine
+from analysis.geocode_cache import GEOCODE_CACHE_PATH, GeocodeCache, normalise_location
 
-# Retrieved variables from .env file
-RETRIEVED_DB_NAME = os.getenv("DB_NAME")  # Retrieve the database name
+# Retrieved variables from .env file (loaded when common.db is imported)
 RETRIEVED_API_KEY = os.getenv("GEOCODING_API_KEY")
 
 
@@ -21,27 +19,16 @@ RETRIEVED_API_KEY = os.getenv("GEOCODING_API_KEY")
 GET_ID_LOCATION_QUERY_PATH = 'analysis/sql_queries/get_id_location.sql'
 GET_CLEANED_LOCATION_QUERY_PATH= 'analysis/sql_queries/get_cleaned_location_query.sql'
 
-def get_db_url():
-    """
-    Load database credentials from environment variables and return the database URL.
-    """
-    load_dotenv()  # Load environment variables
-
-    user = os.getenv("DB_USER")
-    password = os.getenv("DB_PASSWORD")
-    host = os.getenv("DB_HOST")
-    port = os.getenv("DB_PORT")
-    database = os.getenv("DB_NAME")
-
-    if not all([user, password, host, port, database]):
-        raise ValueError("Error: One or more database environment variables are missing.")
+# Jobs table and number of rows sent per round trip when bulk updating it
+JOBS_TABLE_NAME = 'student.data_engineer_jobs'
+UPDATE_CHUNK_SIZE = 10000
 
-    return f"postgresql://{user}:{password}@{host}:{port}/{database}"
+# Number of rows per DataFrame chunk when streaming query results
+QUERY_CHUNK_SIZE = 5000
 
-
-def load_query(db_url, query_path):
+def read_sql_file(query_path):
     """
-    Load table from the database using a SQL query.
+    Read a SQL query from file.
     """
     # Load SQL query from file
     try:
@@ -56,8 +43,17 @@ def load_query(db_url, query_path):
     if not query:
         raise ValueError("Error: The SQL query is empty. Please check the file contents.")
 
-    # Establish database connection using SQLAlchemy
-    engine = create_engine(db_url)
+    return query
+
+
+def load_query(db_url, query_path):
+    """
+    Load table from the database using a SQL query.
+    """
+    query = read_sql_file(query_path)
+
+    # Reuse the cached SQLAlchemy engine and its connection pool for this database
+    engine = get_engine(db_url)
 
     # Execute the query and return results
     try:
@@ -68,146 +64,253 @@ def load_query(db_url, query_path):
         raise Exception(f"An error occurred while executing the query: {e}")
 
 
-# Function to map city names
-def map_city(location):
-    for city in city_map:
-        if city in location:
-            return city_map[city]  # Return mapped city 
-    return None  # Return null 
+def stream_query(query_path, chunk_size=QUERY_CHUNK_SIZE, params=None):
+    """
+    Stream the results of a SQL query as DataFrame chunks.
+
+    Uses a named server-side cursor, so rows stay on the database server until they are
+    fetched and at most `chunk_size` rows are held in client memory at once.
+
+    Parameters:
+        query_path (str): Path to the SQL file to run.
+        chunk_size (int): Number of rows in each DataFrame chunk.
+        params (dict): Optional values for named %(placeholders)s in the query.
+
+    Yields:
+        pd.DataFrame: The next chunk of results.
+    """
+    query = read_sql_file(query_path)
+
+    with get_connection() as conn:
+        # Naming the cursor makes psycopg2 declare it on the server
+        with conn.cursor(name="stream_query_cursor") as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute(query, params)
+
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                columns = [column[0] for column in cursor.description]
+                yield pd.DataFrame(rows, columns=columns)
+
 
 def clean_location_data(df):
     # Remove rows where 'location' is 'UK' too generic to be useful
     df = df[df['location'].str.strip() != 'UK'].copy()
     # Convert 'location' to lowercase
     df.loc[:, 'location'] = df['location'].str.lower()
-    # Apply the map_city function to 'location'
-    df['cleaned_location'] = df['location'].apply(map_city)
+    # Match city names across the whole 'location' column at once
+    df['cleaned_location'] = match_cities(df['location'])
 
     return df
 
-def update_cleaned_location(cleaned_location_df):
+def bulk_update_by_id(df, column_map, chunk_size=UPDATE_CHUNK_SIZE):
+    """
+    Updates columns of the jobs table from a DataFrame with a single set-based UPDATE.
+
+    Rows are loaded into a temporary table with execute_values, in chunks of `chunk_size`
+    rows per round trip, then applied with one UPDATE ... FROM join on id. Everything runs
+    in one transaction, so either every row is updated or none are.
+
+    Parameters:
+        df (pd.DataFrame): DataFrame with an 'id' column and the columns in `column_map`.
+        column_map (dict): Maps DataFrame column to (table column, SQL type),
+            e.g. {'latitude': ('lat', 'DOUBLE PRECISION')}.
+        chunk_size (int): Number of rows sent to the temporary table per round trip.
+
+    Returns:
+        int: Number of rows updated in the jobs table.
+    """
+    df_columns = list(column_map)
+    table_columns = [column_map[column][0] for column in df_columns]
+
+    # Convert NaN to None so missing values are written as NULL
+    values_df = df[['id'] + df_columns].astype(object)
+    values_df = values_df.where(pd.notnull(values_df), None)
+    rows = list(values_df.itertuples(index=False, name=None))
+
+    column_definitions = ', '.join(f"{name} {sql_type}" for name, sql_type in column_map.values())
+    set_clause = ', '.join(f"{column} = tmp.{column}" for column in table_columns)
+
+    # Transaction is committed when the block exits, rolled back on error
+    with get_connection() as conn, conn.cursor() as cursor:
+        # Temporary table only exists for this transaction
+        cursor.execute(f"""
+        CREATE TEMP TABLE tmp_job_updates (id BIGINT PRIMARY KEY, {column_definitions})
+        ON COMMIT DROP;
+        """)
+
+        for start in range(0, len(rows), chunk_size):
+            execute_values(
+                cursor,
+                f"INSERT INTO tmp_job_updates (id, {', '.join(table_columns)}) VALUES %s",
+                rows[start:start + chunk_size],
+                page_size=chunk_size
+            )
+
+        # Single join applies every update in one statement
+        cursor.execute(f"""
+        UPDATE {JOBS_TABLE_NAME} AS jobs
+        SET {set_clause}
+        FROM tmp_job_updates AS tmp
+        WHERE jobs.id = tmp.id;
+        """)
+        return cursor.rowcount
+
 
-    try: 
-        conn = psycopg2.connect(dbname = RETRIEVED_DB_NAME, **DB_CONFIG)
-        cursor = conn.cursor()
-        
-        # Raw SQL for updating cleaned_location given id
-        update_query = f"""
-        UPDATE student.data_engineer_jobs
-        SET cleaned_location = %s
-        WHERE id = %s;
-        """
-
-        for _, row in cleaned_location_df.iterrows():
-            cursor.execute(update_query, (row['cleaned_location'], row['id']))
-
-        conn.commit()
+def update_cleaned_location(cleaned_location_df):
+    """Write the cleaned_location column back to the jobs table in one bulk update."""
+    try:
+        updated = bulk_update_by_id(cleaned_location_df, {'cleaned_location': ('cleaned_location', 'TEXT')})
+        metrics.increment("rows_updated_total", updated, column="cleaned_location")
         print('cleaned_location updated.')
 
     except Exception as e:
         print("An error occurred while updating data:", e)
-    
-    finally:
-        if cursor:
-            cursor.close()
-        if conn: 
-            conn.close()
 
-def run_clean_location_pipeline():
-    location_df = load_query(get_db_url(), GET_ID_LOCATION_QUERY_PATH)
-    cleaned_location_df = clean_location_data(location_df)
-    update_cleaned_location(cleaned_location_df)
+def run_clean_location_pipeline(chunk_size=QUERY_CHUNK_SIZE):
+    # Locations are read, cleaned and written back one chunk at a time to keep memory bounded
+    for location_df in stream_query(GET_ID_LOCATION_QUERY_PATH, chunk_size):
+        cleaned_location_df = clean_location_data(location_df)
+        update_cleaned_location(cleaned_location_df)
 
 
-cleaned_location_df = load_query(get_db_url(), GET_CLEANED_LOCATION_QUERY_PATH)
 
+def geocode_location_opencage(geocoder, location):
+    """
+    Geocodes a single location with OpenCage.
 
-def add_geocoordinates_opencage(cleaned_location_df, api_key):
+    Returns:
+        tuple: (lat, lon, country_code), with None for any value the API did not return.
+    """
+    result = geocoder.geocode(location)
+    if not result or not len(result):
+        return None, None, None
+
+    # Find country code returned by api
+    components = result[0].get("components", {})
+    country_code = components.get("country_code", "")
+    return result[0]["geometry"]["lat"], result[0]["geometry"]["lng"], country_code
+
+
+def add_geocoordinates_opencage(cleaned_location_df, api_key, cache_path=GEOCODE_CACHE_PATH):
     """
     Adds latitude and longitude columns to a dataframe using OpenCage geocoding API.
 
+    Each distinct location is geocoded once, results are stored in a persistent local cache,
+    and only locations missing from the cache are sent to the API. Coordinates are then
+    broadcast back to every row with that location.
+
     Parameters:
         cleaned_location_df (pd.DataFrame): DataFrame with a 'cleaned_location' column.
         api_key (str): OpenCage API key.
+        cache_path (str): Path to the SQLite geocode cache file.
 
     Returns:
         pd.DataFrame: The same DataFrame with 'latitude' and 'longitude' columns added.
     """
-    geocoder = OpenCageGeocode(api_key)
     geocoded_df = cleaned_location_df.copy()
-    geocoded_df["latitude"] = None
-    geocoded_df["longitude"] = None
+    location_keys = geocoded_df["cleaned_location"].map(normalise_location)
+
+    with GeocodeCache(cache_path) as cache:
+        cached = cache.get_many(location_keys.unique())
+
+        # Only distinct locations the cache has not seen are sent to the API, compared by
+        # normalised key so variants like "London" and "london " are geocoded once
+        missing_mask = ~location_keys.isin(cached) & ~location_keys.duplicated()
+        missing_locations = geocoded_df.loc[missing_mask, "cleaned_location"]
+        print(f"Geocoding {len(missing_locations)} new locations ({len(cached)} cached).")
+        metrics.increment("geocode_cache_hits_total", len(cached))
+        metrics.increment("geocode_cache_misses_total", len(missing_locations))
 
-    for index, row in geocoded_df.iterrows():
-        location = row["cleaned_location"]
-        # Added print statement in loop for reassurance, api calling takes time
-        print(f"Geocoding {index + 1}/{len(geocoded_df)}: '{location}'...")
+        geocoder = None
+        if len(missing_locations):
+            # Imported here so the geocoding client is only loaded when there is something to look up
+            from opencage.geocoder import OpenCageGeocode
+            geocoder = OpenCageGeocode(api_key)
 
-        start_time = time.time()
+        for position, location in enumerate(missing_locations, start=1):
+            # Added print statement in loop for reassurance, api calling takes time
+            print(f"Geocoding {position}/{len(missing_locations)}: '{location}'...")
 
-        try:
-            result = geocoder.geocode(location)
-            if result and len(result):
-                # Find country code returned by api check if in UK
-                components = result[0].get("components", {})
-                country_code = components.get("country_code", "")
+            start_time = time.time()
+
+            try:
+                lat, lng, country_code = geocode_location_opencage(geocoder, location)
+                metrics.observe("geocode_request_duration_seconds", time.time() - start_time)
+                cache.set(location, lat, lng, country_code)
+                cached[normalise_location(location)] = (lat, lng, country_code)
 
                 # Only accept UK-based results
-                if country_code == "gb":  
-                    lat = result[0]["geometry"]["lat"]
-                    lng = result[0]["geometry"]["lng"]
-                    geocoded_df.at[index, "latitude"] = lat
-                    geocoded_df.at[index, "longitude"] = lng
+                if country_code == "gb":
                     print(f" UK location | Lat: {lat}, Lon: {lng}")
+                elif country_code is None:
+                    print(f" No result found.")
                 else:
                     print(f" Location not in UK (country_code: {country_code})")
-            else:
-                print(f" No result found.")
-        except Exception as e:
-            print(f" Error geocoding '{location}': {e}")
+            except Exception as e:
+                # Errors are not cached so the location is retried on the next run
+                metrics.increment("geocode_errors_total")
+                print(f" Error geocoding '{location}': {e}")
+
+            # measures time taken to call api and process
+            elapsed_time = time.time() - start_time
+            print(f" Time taken: {elapsed_time:.2f} seconds\n")
 
-        # measures time taken to call api and process
-        elapsed_time = time.time() - start_time
-        print(f" Time taken: {elapsed_time:.2f} seconds\n")
+            time.sleep(0.5)  # Respect OpenCage's rate limit
 
-        time.sleep(0.5)  # Respect OpenCage's rate limit
+    # Broadcast coordinates of UK results back to every row with the same location
+    uk_coordinates = {
+        location: (lat, lon) for location, (lat, lon, country_code) in cached.items() if country_code == "gb"
+    }
+    geocoded_df["latitude"] = location_keys.map(lambda key: uk_coordinates.get(key, (None, None))[0])
+    geocoded_df["longitude"] = location_keys.map(lambda key: uk_coordinates.get(key, (None, None))[1])
+    metrics.increment("rows_geocoded_total", int(geocoded_df["latitude"].notna().sum()))
 
     return geocoded_df
 
 def update_coordinates(geocoded_df):
+    """Write geocoded latitude and longitude back to the jobs table in one bulk update."""
+    try:
+        # Only rows that were successfully geocoded are written
+        located_df = geocoded_df[geocoded_df['latitude'].notna() & geocoded_df['longitude'].notna()]
+        updated = bulk_update_by_id(located_df, {
+            'latitude': ('lat', 'DOUBLE PRECISION'),
+            'longitude': ('lon', 'DOUBLE PRECISION'),
+        })
+        metrics.increment("rows_updated_total", updated, column="coordinates")
+        print('latitude and longitude updated.')
 
-    try: 
-        conn = psycopg2.connect(dbname = RETRIEVED_DB_NAME, **DB_CONFIG)
-        cursor = conn.cursor()
-        
-        # Raw SQL for updating cleaned_location given id
-        update_query = f"""
-        UPDATE student.data_engineer_jobs 
-        SET lat = %s, lon = %s
-        WHERE id = %s;
-        """
+    except Exception as e:
+        print("An error occurred while updating data:", e)
 
-        for _, row in geocoded_df.iterrows():
-            if row['latitude'] is not None and row['longitude'] is not None:
-                cursor.execute(update_query, (row['latitude'], row['longitude'], row['id']))
 
+def run_coordinates_pipeline(chunk_size=QUERY_CHUNK_SIZE):
+    # Geocoded chunk by chunk, the geocode cache stops repeated locations across chunks calling the API
+    for cleaned_location_df in stream_query(GET_CLEANED_LOCATION_QUERY_PATH, chunk_size):
+        geocoded_df = add_geocoordinates_opencage(cleaned_location_df, RETRIEVED_API_KEY)
+        update_coordinates(geocoded_df)
 
-        conn.commit()
-        print('latitude and longitude updated.')
 
-    except Exception as e:
-        print("An error occurred while updating data:", e)
-    
-    finally:
-        if cursor:
-            cursor.close()
-        if conn: 
-            conn.close()
+def main():
+    """
+    Runs the location pipeline against the database.
 
+    Steps:
+    1. Cleans raw locations into standard city names and writes them to cleaned_location.
+    2. Geocodes cleaned locations and writes their coordinates to lat and lon.
+    """
+    try:
+        with metrics.stage("clean_location"):
+            run_clean_location_pipeline()
+        with metrics.stage("geocode"):
+            run_coordinates_pipeline()
+    finally:
+        # Emit stage timings and counters for this run
+        metrics.flush()
 
-def run_coordinates_pipeline():
-    cleaned_location_df = load_query(get_db_url(), GET_CLEANED_LOCATION_QUERY_PATH)
-    geocoded_df = add_geocoordinates_opencage(cleaned_location_df, RETRIEVED_API_KEY)
-    update_coordinates(geocoded_df)
 
-run_coordinates_pipeline()
+# Pipeline only runs when this script is run directly, importing the module does no I/O
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+# Row-oriented CSV export and the columnar Parquet dataset built from it
+DATA_PATH = "cleaned_data.csv"
+DATASET_PATH = "cleaned_data_parquet"
+
+# Column the Parquet dataset is partitioned by
+PARTITION_COLUMN = "created_month"
+
+# Explicit dtypes for the dashboard dataset, so nothing is inferred on load
+DATASET_DTYPES = {
+    'id': 'int64',
+    'title': 'string',
+    'description': 'string',
+    'company': 'category',
+    'location': 'category',
+    'salary_min': 'float64',
+    'salary_max': 'float64',
+    'redirect_url': 'string',
+    'lat': 'float32',
+    'lon': 'float32',
+    'cluster_id': 'Int64',
+}
+
+
+def file_hash(path):
+    """Return the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _dataset_files(dataset_path):
+    # Every data file in the partitioned dataset, in a stable order
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(dataset_path)
+        for name in names
+        if name.endswith(".parquet")
+    )
+
+
+def source_hash(dataset_path=DATASET_PATH, csv_path=DATA_PATH):
+    """
+    Return a hash identifying the current dashboard data.
+
+    Hashes every file of the Parquet dataset if it exists, otherwise the CSV file.
+    """
+    if not os.path.isdir(dataset_path):
+        return file_hash(csv_path)
+
+    digest = hashlib.sha256()
+    for path in _dataset_files(dataset_path):
+        digest.update(os.path.relpath(path, dataset_path).encode())
+        digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def source_modified_time(dataset_path=DATASET_PATH, csv_path=DATA_PATH):
+    """Return the latest modification time of the dashboard data, used to invalidate caches."""
+    if not os.path.isdir(dataset_path):
+        return os.path.getmtime(csv_path)
+    return max((os.path.getmtime(path) for path in _dataset_files(dataset_path)), default=0.0)
+
+
+def prepare_dataset(data_engineer_df):
+    """
+    Applies the dataset dtypes and adds the month partition column.
+
+    Parameters:
+    -----------
+    data_engineer_df : pd.DataFrame
+        Cleaned job listings, as exported to cleaned_data.csv
+
+    Returns:
+    --------
+    pd.DataFrame
+        Copy of the data with explicit dtypes, a timestamp 'created' column and 'created_month'
+    """
+    dataset_df = data_engineer_df.astype(
+        {column: dtype for column, dtype in DATASET_DTYPES.items() if column in data_engineer_df.columns}
+    )
+    dataset_df['created'] = pd.to_datetime(dataset_df['created'])
+    dataset_df[PARTITION_COLUMN] = dataset_df['created'].dt.strftime('%Y-%m')
+    return dataset_df
+
+
+def export_parquet(data_engineer_df, dataset_path=DATASET_PATH):
+    """
+    Writes the cleaned job data to a Parquet dataset partitioned by month.
+
+    Any existing dataset at `dataset_path` is replaced.
+
+    Parameters:
+    -----------
+    data_engineer_df : pd.DataFrame
+        Cleaned job listings
+
+    dataset_path=DATASET_PATH : str
+        Directory the partitioned dataset is written to
+    """
+    if os.path.isdir(dataset_path):
+        shutil.rmtree(dataset_path)
+
+    prepare_dataset(data_engineer_df).to_parquet(
+        dataset_path,
+        engine='pyarrow',
+        partition_cols=[PARTITION_COLUMN],
+        index=False
+    )
+    print(f"Parquet dataset written to '{dataset_path}'.")
+
+
+def export_parquet_from_csv(csv_path=DATA_PATH, dataset_path=DATASET_PATH):
+    """Converts the cleaned CSV export into the partitioned Parquet dataset."""
+    export_parquet(pd.read_csv(csv_path), dataset_path)
+
+
+def select_representatives(df):
+    """
+    Keeps one representative listing per near-duplicate cluster.
+
+    The representative is the listing whose id is the cluster id. Listings that have not been
+    clustered yet, or frames without a 'cluster_id' column, are kept as they are.
+    """
+    if 'cluster_id' not in df.columns:
+        return df
+    return df[df['cluster_id'].isna() | (df['id'] == df['cluster_id'])]
+
+
+def load_dataset(columns=None, dataset_path=DATASET_PATH, csv_path=DATA_PATH):
+    """
+    Loads the dashboard data, reading only the requested columns.
+
+    Reads the Parquet dataset with memory-mapped files when it exists, so columns that are
+    not requested, such as description text, are never read. Falls back to the CSV file.
+    Requested columns that the data does not have, e.g. 'cluster_id' before deduplication
+    has run, are skipped.
+
+    Parameters:
+    -----------
+    columns=None : list of str
+        Columns to load, all columns if None
+
+    Returns:
+    --------
+    pd.DataFrame
+        The requested columns of the cleaned job data
+    """
+    if os.path.isdir(dataset_path):
+        if columns is not None:
+            import pyarrow.dataset
+            available = set(pyarrow.dataset.dataset(dataset_path, partitioning='hive').schema.names)
+            columns = [column for column in columns if column in available]
+        return pd.read_parquet(dataset_path, engine='pyarrow', columns=columns, memory_map=True)
+
+    if columns is None:
+        return pd.read_csv(csv_path)
+    return pd.read_csv(csv_path, usecols=lambda column: column in columns)
+
+
+if __name__ == '__main__':
+    export_parquet_from_csv()
@@ -1,19 +1,22 @@
-import re
-from nltk.corpus import stopwords
-from wordcloud import WordCloud
 from collections import Counter
-from nltk.tokenize import word_tokenize
-from matplotlib.colors import LinearSegmentedColormap
-from PIL import Image
-import nltk
-from nltk.data import find
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
 import os
+from functools import lru_cache
+
+from analysis.keyword_counter import NUMBER_PATTERN, PUNCTUATION_PATTERN, KeywordTrie
+
+# NLTK, wordcloud and matplotlib are imported lazily inside the functions that use them,
+# so importing this module does no I/O and stays fast for pages that never need them.
+
+# Fonts bundled with the dashboard, resolved from this file so rendering works from any directory
+FONT_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "fonts"))
+WORDCLOUD_FONT_PATH = os.path.join(FONT_DIRECTORY, "dejavu-sans-bold.ttf")
 
 
 # Helper function to check if NLTK resource is already downloaded in either 'tokenizers' or 'corpora'
 def ensure_resource(resource_name):
+    import nltk
+    from nltk.data import find
+
     try:
         # Check in both 'tokenizers' and 'corpora' directories
         find(f'tokenizers/{resource_name}')
@@ -24,45 +27,125 @@ def ensure_resource(resource_name):
             # If not found in either, download the resource
             nltk.download(resource_name)
 
-# Ensure 'punkt', 'punkt_tab' and 'stopwords' and are downloaded
-ensure_resource('punkt')
-ensure_resource('stopwords')
-ensure_resource('punkt_tab')
 
+@lru_cache(maxsize=None)
+def ensure_nltk_resources():
+    """Ensure 'punkt', 'punkt_tab' and 'stopwords' are downloaded, checked once per process."""
+    ensure_resource('punkt')
+    ensure_resource('stopwords')
+    ensure_resource('punkt_tab')
 
 
+@lru_cache(maxsize=None)
+def get_stop_words():
+    """Return the English stopword set, loaded once on first use and shared by every call."""
+    ensure_nltk_resources()
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
 
 
-def process_data_frame(data_frame, column_name='description'):
+@lru_cache(maxsize=None)
+def get_word_tokenize():
+    """Return NLTK's word_tokenize, imported on first use."""
+    ensure_nltk_resources()
+    from nltk.tokenize import word_tokenize
+    return word_tokenize
+
+
+def tokenize_description(text):
     """
-    Preprocesses text data in a DataFrame column:
+    Preprocesses a single description into a list of cleaned words:
     - Converts text to lowercase
     - Removes punctuation & numbers
     - Tokenizes text
     - Removes stopwords
 
+    Args:
+        text (str): A single job description.
+
+    Returns:
+        list: A list of cleaned words.
+    """
+    text = text.lower()  # Lowercase
+    text = PUNCTUATION_PATTERN.sub('', text)  # Remove punctuation
+    text = NUMBER_PATTERN.sub('', text)  # Remove numbers
+
+    words = get_word_tokenize()(text)  # Tokenize
+    stop_words = get_stop_words()
+    return [word for word in words if word not in stop_words]  # Remove stopwords
+
+
+def iter_document_tokens(data_frame, column_name='description'):
+    """
+    Lazily tokenises a DataFrame column one description at a time.
+
+    Only one description is held in processed form at once, so memory stays flat as the
+    number of listings grows. Missing descriptions are skipped.
+
     Args:
         data_frame (pd.DataFrame): The DataFrame containing text data.
         column_name (str): The column to process (default: 'description').
 
     Returns:
-        list: A list of cleaned words.
+        generator: Yields a list of cleaned words for each description.
     """
-    # Error Handling - ensure column exists in the dataframe
+    # Error Handling - ensure column exists in the dataframe, checked before iteration starts
     if column_name not in data_frame.columns:
         raise ValueError(f"Column '{column_name}' not found in DataFrame")
 
-    text = ' '.join(data_frame[column_name].dropna().astype(str))  # Convert to string & join
+    return (tokenize_description(str(text)) for text in data_frame[column_name].dropna())
 
-    text = text.lower()  # Lowercase
-    text = re.sub(r'[^\w\s]', '', text)  # Remove punctuation
-    text = re.sub(r'\d+', '', text)  # Remove numbers
 
-    words = word_tokenize(text)  # Tokenize
-    stop_words = set(stopwords.words('english'))  # Load stopwords
-    words = [word for word in words if word not in stop_words]  # Remove stopwords
+def iter_chunk_document_tokens(chunks, column_name='description'):
+    """
+    Lazily tokenises descriptions from a stream of DataFrame chunks, one description at a time.
+
+    Lets the NLP stage consume `data_clean_load.stream_query` directly, for example
+    `count_word_category_stream(iter_chunk_document_tokens(stream_query(path)), tech)`,
+    so only one chunk of descriptions is in memory at once.
 
-    return words
+    Args:
+        chunks (iterable of pd.DataFrame): DataFrame chunks containing text data.
+        column_name (str): The column to process (default: 'description').
+
+    Returns:
+        generator: Yields a list of cleaned words for each description.
+    """
+    for chunk in chunks:
+        yield from iter_document_tokens(chunk, column_name)
+
+
+def iter_tokens(data_frame, column_name='description'):
+    """
+    Lazily yields every cleaned word in a DataFrame column, one description at a time.
+
+    Args:
+        data_frame (pd.DataFrame): The DataFrame containing text data.
+        column_name (str): The column to process (default: 'description').
+
+    Returns:
+        generator: Yields cleaned words in description order.
+    """
+    document_tokens = iter_document_tokens(data_frame, column_name)
+    return (word for words in document_tokens for word in words)
+
+
+def process_data_frame(data_frame, column_name='description'):
+    """
+    Preprocesses text data in a DataFrame column:
+    - Converts text to lowercase
+    - Removes punctuation & numbers
+    - Tokenizes text
+    - Removes stopwords
+
+    Args:
+        data_frame (pd.DataFrame): The DataFrame containing text data.
+        column_name (str): The column to process (default: 'description').
+
+    Returns:
+        list: A list of cleaned words.
+    """
+    return list(iter_tokens(data_frame, column_name))
 
 
 # Function for counting most common words from list of processed words
@@ -72,6 +155,20 @@ def top_words_counter(processed_words, number_of_words = 10):
     return dict(most_common_words)
 
 
+@lru_cache(maxsize=None)
+def compile_word_category(word_list):
+    """
+    Compiles a category word list into a KeywordTrie, cached so each list is compiled once.
+
+    Args:
+        word_list (tuple of str): Keywords or phrases, as a tuple so it can be cached.
+
+    Returns:
+        KeywordTrie: Trie matching the keywords against processed tokens.
+    """
+    return KeywordTrie(word_list, stop_words=get_stop_words())
+
+
 def multi_count_word_category(processed_words, word_list):
     """
     Counts occurrences of words or multi-word phrases from a predefined category list 
@@ -93,61 +190,90 @@ def multi_count_word_category(processed_words, word_list):
 
     Explanation:
     ------------
-    1. Converts all words/phrases in `word_list` to lowercase for case-insensitive matching.
-    2. Sorts phrases by length (longest first) to ensure multi-word phrases are matched before 
-       individual words (avoids partial matching issues).
-    3. Joins the processed words into a single string for efficient phrase matching.
-    4. Iterates through the sorted list and counts occurrences of each word/phrase in the text.
-    5. Maps the counted words/phrases back to their original form from `word_list` (preserving case).
-    6. Returns a dictionary with the counts of matched words and phrases.
-    """
-    # Normalize the word list and create a mapping from lowercase to original word/phrase
-    word_mapping = {word.lower(): word for word in word_list}
-    
-    # Sort words/phrases by length (longest first) to prioritize multi-word phrases
-    sorted_words = sorted(word_mapping.keys(), key=len, reverse=True)
-    
-    # Initialize a Counter for word occurrences
+    1. Compiles `word_list` once into a token-level trie, normalising each keyword the same way
+       descriptions are processed (lowercase, no punctuation, numbers or stopwords).
+    2. Walks `processed_words` a single time, matching whole tokens only, so "git" does not
+       match inside "digital" and "java" does not match "javascript".
+    3. At each position the longest keyword is matched and its tokens consumed, so multi-word
+       phrases are matched before, and not double counted as, their individual words.
+    4. Returns a dictionary with the counts of matched words and phrases, keyed by their
+       original form from `word_list` (preserving case).
+    """
+    word_trie = compile_word_category(tuple(word_list))
+    return dict(word_trie.count(processed_words))
+
+
+def count_word_category_stream(document_tokens, word_list):
+    """
+    Counts words or multi-word phrases from a category list over a stream of documents.
+
+    Works like `multi_count_word_category` but consumes one document's tokens at a time,
+    e.g. straight from `iter_document_tokens`, so the corpus is never held in memory.
+    Phrases are matched within a document, never across two documents.
+
+    Parameters:
+    -----------
+    document_tokens : iterable of list of str
+        Processed tokens for each document
+
+    word_list : list of str
+        A list of keywords or multi-word phrases to count
+
+    Returns:
+    --------
+    dict
+        A dictionary of counts keyed by the original words/phrases from `word_list`
+    """
+    word_trie = compile_word_category(tuple(word_list))
     word_count = Counter()
+    for tokens in document_tokens:
+        word_trie.count(tokens, word_count)
+    return dict(word_count)
 
-    # Convert tokenized text into a single string with spaces (for phrase matching)
-    text_string = " ".join(processed_words)
 
-    # Match words/phrases in the text
-    for word in sorted_words:
-        count = text_string.count(word)  # Count occurrences of the word/phrase
-        if count > 0:
-            word_count[word] += count
+def wordcloud_from_frequencies(frequencies, width=800, height=400, font_path=WORDCLOUD_FONT_PATH):
+    """
+    Renders a word cloud in the dashboard style from a dictionary of word frequencies.
 
-    # Map counts back to the original words/phrases (preserving case)
-    mapped_word_count = {word_mapping[word]: count for word, count in word_count.items()}
-    
-    return mapped_word_count
+    Args:
+        frequencies (dict): Count for each word or phrase, e.g. from `multi_count_word_category`.
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        font_path (str): TrueType font to draw words with, the bundled DejaVu Sans Bold by default.
 
+    Returns:
+        WordCloud: The rendered word cloud, `.to_image()` gives a PIL image.
+    """
+    from wordcloud import WordCloud
+    from matplotlib.colors import LinearSegmentedColormap
 
-# Function to create word cloud using word count frequencies
-# Accepts multi_count_word_category and top_words_counter functions in argument to produce cloud
-def generate_wordcloud_image(processed_words, word_list=None, count_function=multi_count_word_category):
     colors = ["#339783", "#339733", "#339723"]
     custom_cmap = LinearSegmentedColormap.from_list("custom_cmap", colors)
 
-    font_path = os.path.join(os.path.dirname(__file__), "app", "fonts", "dejavu-sans-bold.ttf")
-
     wordcloud = WordCloud(
-        width=800,
-        height=400,
+        width=width,
+        height=height,
         background_color='black',
         colormap=custom_cmap,
         prefer_horizontal=1.0,
         font_path=font_path
     )
 
-    wordcloud.generate_from_frequencies(count_function(processed_words, word_list))
+    wordcloud.generate_from_frequencies(frequencies)
     return wordcloud
 
 
+# Function to create word cloud using word count frequencies
+# Accepts multi_count_word_category and top_words_counter functions in argument to produce cloud
+def generate_wordcloud_image(processed_words, word_list=None, count_function=multi_count_word_category):
+    return wordcloud_from_frequencies(count_function(processed_words, word_list))
+
+
 # test function to see if wordcoud works on remote streamlit server without font error
 def test_wordcloud_image(processed_words, word_list=None, count_function=multi_count_word_category):
+    from wordcloud import WordCloud
+    from matplotlib.colors import LinearSegmentedColormap
+
     colors = ["#339783", "#339733", "#339723"]
     custom_cmap = LinearSegmentedColormap.from_list("custom_cmap", colors)   
 
@@ -165,10 +291,13 @@ def test_wordcloud_image(processed_words, word_list=None, count_function=multi_c
 
 # create backup word cloud image 
 def save_wordcloud_image(processed_words, word_list=None, count_function=multi_count_word_category, output_path="wordcloud.png"):
+    from wordcloud import WordCloud
+    from matplotlib.colors import LinearSegmentedColormap
+
     colors = ["#339783", "#339733", "#339723"]
     custom_cmap = LinearSegmentedColormap.from_list("custom_cmap", colors)
 
-    font_path = "app/fonts/JetBrainsMono-Bold.ttf"
+    font_path = os.path.join(FONT_DIRECTORY, "JetBrainsMono-Bold.ttf")
 
     wordcloud = WordCloud(
         width=800,
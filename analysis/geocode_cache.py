@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import time
+
+
+# Local SQLite file holding geocoding results between pipeline runs
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", "analysis/geocode_cache.sqlite3")
+
+# Cached results older than this are treated as missing and looked up again
+GEOCODE_CACHE_TTL_SECONDS = 90 * 24 * 60 * 60  # 90 days
+
+
+def normalise_location(location):
+    """Return the cache key for a location: lowercased with whitespace collapsed."""
+    return ' '.join(str(location).lower().split())
+
+
+class GeocodeCache:
+    """
+    Persistent cache of geocoding results keyed by normalised location name.
+
+    Each entry stores latitude, longitude, the country code returned by the API and the
+    time it was stored. Locations that geocoded outside the UK, or returned no result,
+    are cached too so they are not looked up again.
+
+    Parameters:
+    -----------
+    path=GEOCODE_CACHE_PATH : str
+        Path to the SQLite cache file, created if it does not exist
+
+    ttl_seconds=GEOCODE_CACHE_TTL_SECONDS : int
+        Age in seconds after which an entry is evicted
+    """
+
+    def __init__(self, path=GEOCODE_CACHE_PATH, ttl_seconds=GEOCODE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            location TEXT PRIMARY KEY,
+            lat REAL,
+            lon REAL,
+            country_code TEXT,
+            cached_at REAL NOT NULL
+        )
+        """)
+        self.evict_expired()
+
+    def evict_expired(self):
+        """Delete entries older than the cache TTL."""
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM geocode_cache WHERE cached_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+
+    def get_many(self, locations):
+        """
+        Look up several locations at once.
+
+        Returns:
+        --------
+        dict
+            Maps each cached normalised location to a (lat, lon, country_code) tuple.
+            Locations not in the cache are left out.
+        """
+        keys = list({normalise_location(location) for location in locations})
+        results = {}
+        # SQLite limits the number of bound parameters, so look up in batches
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ', '.join('?' for _ in batch)
+            rows = self.conn.execute(
+                f"SELECT location, lat, lon, country_code FROM geocode_cache WHERE location IN ({placeholders})",
+                batch
+            )
+            for location, lat, lon, country_code in rows:
+                results[location] = (lat, lon, country_code)
+        return results
+
+    def set(self, location, lat, lon, country_code):
+        """Store or replace the geocoding result for a location."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (location, lat, lon, country_code, cached_at) VALUES (?, ?, ?, ?, ?)",
+                (normalise_location(location), lat, lon, country_code, time.time())
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,174 @@
+import math
+import os
+import sys
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from analysis.keyword_counter import NUMBER_PATTERN, PUNCTUATION_PATTERN
+
+# Database helpers are imported inside add_search_column, so the dashboard can search the
+# CSV/Parquet data without loading a database driver.
+
+
+# Number of matches shown per page of search results
+SEARCH_PAGE_SIZE = 25
+
+# Title matches count more than description matches, like the 'A' and 'B' weights in the database
+SEARCH_FIELD_WEIGHTS = {'title': 2.0, 'description': 1.0}
+
+
+@lru_cache(maxsize=None)
+def _get_stemmer():
+    # Imported on first use, the Porter stemmer needs no NLTK downloads
+    from nltk.stem import PorterStemmer
+    return PorterStemmer()
+
+
+@lru_cache(maxsize=100000)
+def _stem(word):
+    return _get_stemmer().stem(word)
+
+
+def search_terms(text):
+    """
+    Splits text into the stemmed terms it is indexed and searched by.
+
+    Lowercases, splits words at punctuation, removes numbers, then stems each word, so
+    "data-engineer" is "data engineer" and "Pipelines" and "pipeline" are the same term,
+    as with PostgreSQL's 'english' text search config.
+    """
+    text = NUMBER_PATTERN.sub('', PUNCTUATION_PATTERN.sub(' ', str(text).lower()))
+    return [_stem(word) for word in text.split()]
+
+
+def parse_search_text(search_text):
+    """
+    Splits search text into required and excluded terms.
+
+    Every word must match, and words starting with '-' must not, following the basic
+    `websearch_to_tsquery` syntax.
+
+    Returns:
+        tuple of set: (required terms, excluded terms).
+    """
+    required, excluded = set(), set()
+    for word in str(search_text).split():
+        if word.startswith('-'):
+            excluded.update(search_terms(word[1:]))
+        else:
+            required.update(search_terms(word))
+    return required, excluded
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index over job titles and descriptions, for the CSV/Parquet mode.
+
+    Each term maps to the sorted rows containing it and a weighted term frequency per row,
+    so a search only touches the posting lists of its own terms. Results are ranked by
+    tf-idf, with title matches weighted by SEARCH_FIELD_WEIGHTS.
+
+    Parameters:
+    -----------
+    data_frame : pd.DataFrame
+        Listings to index, search results are row positions in this frame
+
+    field_weights=SEARCH_FIELD_WEIGHTS : dict
+        Weight of each indexed column
+    """
+
+    def __init__(self, data_frame, field_weights=SEARCH_FIELD_WEIGHTS):
+        self.size = len(data_frame)
+
+        term_rows = defaultdict(dict)
+        for column, weight in field_weights.items():
+            if column not in data_frame.columns:
+                continue
+            for row, text in enumerate(data_frame[column]):
+                if pd.isna(text):
+                    continue
+                for term in search_terms(text):
+                    row_weights = term_rows[term]
+                    row_weights[row] = row_weights.get(row, 0.0) + weight
+
+        # Posting lists are sorted by row so they can be intersected and looked up with searchsorted
+        self.postings = {}
+        for term, row_weights in term_rows.items():
+            rows = np.fromiter(sorted(row_weights), dtype=np.int64, count=len(row_weights))
+            frequencies = np.fromiter((row_weights[row] for row in rows), dtype=np.float64, count=len(rows))
+            self.postings[term] = (rows, frequencies)
+
+    def search(self, search_text):
+        """
+        Finds rows matching every search term, best match first.
+
+        Parameters:
+        -----------
+        search_text : str
+            Words to search for, words starting with '-' exclude rows containing them
+
+        Returns:
+        --------
+        np.ndarray
+            Row positions of the matches in ranked order
+        """
+        required, excluded = parse_search_text(search_text)
+        if not required or any(term not in self.postings for term in required):
+            return np.empty(0, dtype=np.int64)
+
+        # Intersect from the shortest posting list so intermediate results stay small
+        terms = sorted(required, key=lambda term: len(self.postings[term][0]))
+        matches = self.postings[terms[0]][0]
+        for term in terms[1:]:
+            matches = np.intersect1d(matches, self.postings[term][0], assume_unique=True)
+
+        for term in excluded:
+            if term in self.postings:
+                matches = np.setdiff1d(matches, self.postings[term][0], assume_unique=True)
+
+        scores = np.zeros(len(matches))
+        for term in terms:
+            rows, frequencies = self.postings[term]
+            inverse_document_frequency = math.log(1 + self.size / len(rows))
+            scores += (1 + np.log(frequencies[np.searchsorted(rows, matches)])) * inverse_document_frequency
+
+        # Highest score first, ties in row order
+        return matches[np.lexsort((matches, -scores))]
+
+
+def paginate(rows, page, page_size=SEARCH_PAGE_SIZE):
+    """Returns the slice of `rows` shown on a zero-based page."""
+    start = page * page_size
+    return rows[start:start + page_size]
+
+
+def add_search_column():
+    """
+    Adds a weighted tsvector column over title and description, with a GIN index, to the jobs table.
+
+    The column is generated, so PostgreSQL keeps it up to date as listings are inserted or changed.
+    The dashboard searches its CSV/Parquet data with InvertedIndex, the column is for queries run
+    directly against the database, e.g.
+    `WHERE search_vector @@ websearch_to_tsquery('english', 'airflow -azure')`.
+    """
+    from analysis.data_clean_load import JOBS_TABLE_NAME
+    from common.db import get_connection
+
+    with get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(f"""
+        ALTER TABLE {JOBS_TABLE_NAME}
+        ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED;
+        """)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS data_engineer_jobs_search_idx ON {JOBS_TABLE_NAME} USING GIN (search_vector);")
+    print("Search column and index created (or already exist).")
+
+
+if __name__ == '__main__':
+    add_search_column()
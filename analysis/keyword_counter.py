@@ -0,0 +1,109 @@
+import re
+from collections import Counter
+
+
+# Marks the end of a keyword in the trie, never equal to a token
+_KEYWORD_END = None
+
+# Same cleaning steps applied to descriptions in process_data_frame
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+NUMBER_PATTERN = re.compile(r'\d+')
+
+
+def normalise_keyword(keyword, stop_words=frozenset()):
+    """
+    Converts a keyword or phrase into the tokens it appears as in processed text.
+
+    Applies the same steps as description processing: lowercase, remove punctuation and
+    numbers, split on whitespace and drop stopwords. For example "Attention to Detail"
+    becomes ('attention', 'detail') and "Cost-Benefit" becomes ('costbenefit',).
+
+    Parameters:
+    -----------
+    keyword : str
+        Keyword or multi-word phrase
+
+    stop_words=frozenset() : set of str
+        Stopwords removed from processed text, removed from the keyword too
+
+    Returns:
+    --------
+    tuple of str
+        Tokens making up the keyword
+    """
+    text = NUMBER_PATTERN.sub('', PUNCTUATION_PATTERN.sub('', keyword.lower()))
+    return tuple(token for token in text.split() if token not in stop_words)
+
+
+class KeywordTrie:
+    """
+    Token-level trie of keywords and phrases for counting them in one pass over tokens.
+
+    Matching happens on whole tokens, so "git" never matches inside "digital". At each
+    position the longest keyword is matched and its tokens are consumed, so the words of
+    a phrase such as "google cloud" are not counted again on their own.
+
+    Parameters:
+    -----------
+    word_list : list of str
+        Keywords or multi-word phrases to count, in their display spelling
+
+    stop_words=frozenset() : set of str
+        Stopwords removed from the processed text the trie will be run over
+    """
+
+    def __init__(self, word_list, stop_words=frozenset()):
+        self.root = {}
+        for word in word_list:
+            tokens = normalise_keyword(word, stop_words)
+            if not tokens:
+                continue
+            node = self.root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            # Keep the first spelling if two keywords normalise to the same tokens
+            node.setdefault(_KEYWORD_END, word)
+
+    def count(self, tokens, counter=None):
+        """
+        Counts keyword occurrences in a sequence of tokens.
+
+        Parameters:
+        -----------
+        tokens : list of str
+            Processed tokens, e.g. from one description
+
+        counter=None : Counter
+            Optional Counter to add counts to, useful when counting across documents
+
+        Returns:
+        --------
+        Counter
+            Counts keyed by keyword display spelling
+        """
+        if counter is None:
+            counter = Counter()
+
+        position = 0
+        total_tokens = len(tokens)
+        while position < total_tokens:
+            node = self.root
+            cursor = position
+            match = None
+            match_end = position
+
+            # Walk the trie as far as the tokens allow, remembering the longest complete keyword
+            while cursor < total_tokens and tokens[cursor] in node:
+                node = node[tokens[cursor]]
+                cursor += 1
+                if _KEYWORD_END in node:
+                    match = node[_KEYWORD_END]
+                    match_end = cursor
+
+            if match is None:
+                position += 1
+            else:
+                counter[match] += 1
+                position = match_end
+
+        return counter
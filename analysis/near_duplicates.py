@@ -0,0 +1,194 @@
+import os
+import sys
+import zlib
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from analysis.data_clean_load import bulk_update_by_id, stream_query
+from analysis.keyword_counter import NUMBER_PATTERN, PUNCTUATION_PATTERN
+from common import metrics
+from common.db import get_connection
+
+
+# Defined sql query path
+GET_DUPLICATE_FIELDS_QUERY_PATH = 'analysis/sql_queries/get_duplicate_fields_query.sql'
+
+# Number of consecutive words in each shingle
+SHINGLE_SIZE = 5
+
+# MinHash signature length, split into LSH bands of rows: 16 bands x 8 rows
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+# Estimated Jaccard similarity at or above which two listings count as duplicates
+SIMILARITY_THRESHOLD = 0.8
+
+# Hash family parameters, seeded so signatures are stable between runs
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_PERMUTATION_A = _rng.randint(1, 1 << 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERMUTATION_B = _rng.randint(0, 1 << 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Returns the set of hashed word shingles in a text.
+
+    Text is lowercased with punctuation and numbers removed, then every run of `size`
+    consecutive words is hashed. Texts shorter than `size` words give a single shingle.
+    """
+    words = NUMBER_PATTERN.sub('', PUNCTUATION_PATTERN.sub('', str(text).lower())).split()
+    if len(words) <= size:
+        return {zlib.crc32(' '.join(words).encode())}
+    return {zlib.crc32(' '.join(words[i:i + size]).encode()) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(shingle_set):
+    """
+    Computes the MinHash signature of a set of hashed shingles.
+
+    Returns:
+        np.ndarray: NUM_PERMUTATIONS uint64 values, the minimum of each permuted hash.
+    """
+    hashes = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+    # Universal hashing (a * x + b) mod p, one column per permutation
+    permuted = (np.outer(hashes, _PERMUTATION_A) + _PERMUTATION_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0)
+
+
+def listing_text(df):
+    """Combine title, company and description into the text compared for duplicates."""
+    return (
+        df['title'].fillna('').astype(str) + ' ' +
+        df['company'].fillna('').astype(str) + ' ' +
+        df['description'].fillna('').astype(str)
+    )
+
+
+def compute_signatures(df):
+    """
+    Computes MinHash signatures for every listing in a DataFrame.
+
+    Parameters:
+        df (pd.DataFrame): Listings with 'title', 'company' and 'description' columns.
+
+    Returns:
+        np.ndarray: Array of shape (len(df), NUM_PERMUTATIONS).
+    """
+    if df.empty:
+        return np.empty((0, NUM_PERMUTATIONS), dtype=np.uint64)
+    return np.vstack([minhash_signature(shingles(text)) for text in listing_text(df)])
+
+
+def _find(parents, item):
+    # Union-find lookup with path halving
+    while parents[item] != item:
+        parents[item] = parents[parents[item]]
+        item = parents[item]
+    return item
+
+
+def cluster_signatures(ids, signatures, threshold=SIMILARITY_THRESHOLD):
+    """
+    Groups listings whose MinHash signatures indicate near-duplicate text.
+
+    Locality sensitive hashing puts listings into buckets per band of the signature, so only
+    listings sharing a bucket are compared. Each bucket member is compared against the
+    bucket's first member, keeping the work linear in the number of listings.
+
+    Parameters:
+        ids (list of int): Job ids, aligned with `signatures`.
+        signatures (np.ndarray): MinHash signatures from `compute_signatures`.
+        threshold (float): Minimum estimated Jaccard similarity to join a cluster.
+
+    Returns:
+        list of int: Cluster id for each listing, the smallest job id in its cluster.
+    """
+    parents = list(range(len(ids)))
+
+    for band in range(LSH_BANDS):
+        buckets = defaultdict(list)
+        band_values = signatures[:, band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        for position, values in enumerate(band_values):
+            buckets[values.tobytes()].append(position)
+
+        for members in buckets.values():
+            first = members[0]
+            for other in members[1:]:
+                root_first, root_other = _find(parents, first), _find(parents, other)
+                if root_first == root_other:
+                    continue
+                # Fraction of matching signature values estimates the Jaccard similarity
+                if np.mean(signatures[first] == signatures[other]) >= threshold:
+                    parents[root_other] = root_first
+
+    # Label each cluster with the smallest job id it contains
+    cluster_ids = {}
+    for position, job_id in enumerate(ids):
+        root = _find(parents, position)
+        cluster_ids[root] = min(cluster_ids.get(root, job_id), job_id)
+    return [cluster_ids[_find(parents, position)] for position in range(len(ids))]
+
+
+def assign_duplicate_clusters(df):
+    """
+    Adds a 'cluster_id' column grouping near-duplicate listings.
+
+    Parameters:
+        df (pd.DataFrame): Listings with 'id', 'title', 'company' and 'description' columns.
+
+    Returns:
+        pd.DataFrame: Copy of `df` with 'cluster_id' set to the smallest id in each cluster.
+    """
+    clustered_df = df.copy()
+    clustered_df['cluster_id'] = cluster_signatures(list(df['id']), compute_signatures(df))
+    return clustered_df
+
+
+def add_cluster_column():
+    """Add the cluster_id column and its index to the jobs table if they do not exist."""
+    with get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("ALTER TABLE student.data_engineer_jobs ADD COLUMN IF NOT EXISTS cluster_id BIGINT;")
+        cursor.execute("CREATE INDEX IF NOT EXISTS data_engineer_jobs_cluster_id_idx ON student.data_engineer_jobs (cluster_id);")
+
+
+def run_near_duplicate_pipeline():
+    """
+    Clusters every stored listing and writes cluster ids back to the jobs table.
+
+    Listings are streamed in chunks and only their ids and signatures are kept in memory.
+    """
+    add_cluster_column()
+
+    ids = []
+    signature_chunks = []
+    for chunk in stream_query(GET_DUPLICATE_FIELDS_QUERY_PATH):
+        ids.extend(chunk['id'])
+        signature_chunks.append(compute_signatures(chunk))
+
+    if not ids:
+        print("No listings to cluster.")
+        return
+
+    cluster_ids = cluster_signatures(ids, np.vstack(signature_chunks))
+    clusters_df = pd.DataFrame({'id': ids, 'cluster_id': cluster_ids})
+
+    duplicates = int((clusters_df['id'] != clusters_df['cluster_id']).sum())
+    metrics.increment("near_duplicates_total", duplicates)
+    print(f"Clustered {len(ids)} listings, {duplicates} are near-duplicates of another listing.")
+
+    bulk_update_by_id(clusters_df, {'cluster_id': ('cluster_id', 'BIGINT')})
+    print('cluster_id updated.')
+
+
+if __name__ == '__main__':
+    try:
+        with metrics.stage("near_duplicates"):
+            run_near_duplicate_pipeline()
+    finally:
+        metrics.flush()
@@ -85,4 +85,9 @@ city_map = {
     "inverness": "Inverness",
     "burnley": "Burnley",
     "welwyn garden city": "Welwyn Garden City"
-}
\ No newline at end of file
+}
+
+# Place names that contain a city key but are not that UK city, mapped to None
+non_uk_locations = {
+    "new york": None,
+}
@@ -1,10 +1,3 @@
 # config settings
-import os
-from dotenv import load_dotenv
-
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "port": os.getenv("DB_PORT"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-}
\ No newline at end of file
+# Database configuration is owned by the shared data-access module
+from common.db import DB_CONFIG, DB_NAME
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import sys
+
+from psycopg2.extras import execute_values
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from analysis import description_analysis as da
+from analysis.data_clean_load import QUERY_CHUNK_SIZE, read_sql_file, stream_query
+from analysis.near_duplicates import add_cluster_column
+from analysis.resources.technologies import tech
+from analysis.resources.non_tech_skills import non_tech_skills
+from common import metrics
+from common.db import get_connection
+
+
+# Defined sql query paths
+GET_UNPROCESSED_SKILL_JOBS_QUERY_PATH = 'analysis/sql_queries/get_unprocessed_skill_jobs_query.sql'
+GET_SKILL_TOTALS_QUERY_PATH = 'analysis/sql_queries/get_skill_totals_query.sql'
+
+# Tables holding per-job skill counts and which skill list version each job was counted with
+SKILL_COUNTS_TABLE_NAME = 'student.job_skill_counts'
+SKILL_PROCESSED_TABLE_NAME = 'student.job_skill_processed'
+
+# Skill categories counted for each job
+SKILL_CATEGORIES = {
+    'tech': tech,
+    'professional': non_tech_skills,
+}
+
+
+def skill_list_version():
+    """
+    Return a short hash of the skill lists.
+
+    Any change to `tech` or `non_tech_skills` changes the version, which marks every job
+    counted with the old lists as needing a backfill.
+    """
+    payload = json.dumps({category: sorted(words) for category, words in SKILL_CATEGORIES.items()}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def create_skill_count_tables():
+    """Create the per-job skill count and processed marker tables if they do not exist."""
+    # Rollups only count one listing per near-duplicate cluster, so the column must exist
+    add_cluster_column()
+
+    with get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SKILL_COUNTS_TABLE_NAME} (
+            job_id BIGINT REFERENCES student.data_engineer_jobs (id) ON DELETE CASCADE,
+            category TEXT,
+            skill TEXT,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (job_id, category, skill)
+        );
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SKILL_PROCESSED_TABLE_NAME} (
+            job_id BIGINT PRIMARY KEY REFERENCES student.data_engineer_jobs (id) ON DELETE CASCADE,
+            skill_version TEXT NOT NULL,
+            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS job_skill_counts_category_skill_idx ON {SKILL_COUNTS_TABLE_NAME} (category, skill);")
+    print("Skill count tables created (or already exist).")
+
+
+def count_job_skills(chunk):
+    """
+    Counts skills in each job description of a chunk.
+
+    Parameters:
+        chunk (pd.DataFrame): Jobs with 'id' and 'description' columns.
+
+    Returns:
+        list of tuple: (job_id, category, skill, count) rows for every skill found.
+    """
+    tries = {category: da.compile_word_category(tuple(words)) for category, words in SKILL_CATEGORIES.items()}
+
+    rows = []
+    for job_id, description in zip(chunk['id'], chunk['description']):
+        tokens = da.tokenize_description(str(description)) if description is not None else []
+        for category, word_trie in tries.items():
+            for skill, count in word_trie.count(tokens).items():
+                rows.append((int(job_id), category, skill, count))
+    return rows
+
+
+def store_job_skill_counts(job_ids, rows, version):
+    """
+    Replace the skill counts of a set of jobs and mark them as processed, in one transaction.
+    """
+    with get_connection() as conn, conn.cursor() as cursor:
+        # Old counts are removed first so backfilled jobs do not keep skills that were dropped
+        cursor.execute(f"DELETE FROM {SKILL_COUNTS_TABLE_NAME} WHERE job_id = ANY(%s);", (job_ids,))
+        execute_values(
+            cursor,
+            f"INSERT INTO {SKILL_COUNTS_TABLE_NAME} (job_id, category, skill, count) VALUES %s",
+            rows,
+            page_size=1000
+        )
+        execute_values(
+            cursor,
+            f"""
+            INSERT INTO {SKILL_PROCESSED_TABLE_NAME} (job_id, skill_version, processed_at) VALUES %s
+            ON CONFLICT (job_id) DO UPDATE
+            SET skill_version = EXCLUDED.skill_version, processed_at = EXCLUDED.processed_at
+            """,
+            [(job_id, version) for job_id in job_ids],
+            template="(%s, %s, NOW())",
+            page_size=1000
+        )
+
+
+def update_job_skill_counts(chunk_size=QUERY_CHUNK_SIZE):
+    """
+    Counts skills only for jobs not yet processed with the current skill lists.
+
+    New jobs and jobs counted with an older skill list version are tokenised and counted,
+    everything else is left untouched.
+
+    Returns:
+        int: Number of jobs processed.
+    """
+    version = skill_list_version()
+    processed = 0
+
+    for chunk in stream_query(GET_UNPROCESSED_SKILL_JOBS_QUERY_PATH, chunk_size, {'skill_version': version}):
+        job_ids = [int(job_id) for job_id in chunk['id']]
+        store_job_skill_counts(job_ids, count_job_skills(chunk), version)
+        processed += len(job_ids)
+
+    metrics.increment("jobs_skill_counted_total", processed)
+    print(f"Skill counts updated for {processed} jobs (skill list version {version}).")
+    return processed
+
+
+def load_skill_totals(category):
+    """
+    Aggregate stored per-job counts into totals for one skill category.
+
+    Only one listing per near-duplicate cluster is counted.
+
+    Parameters:
+        category (str): A key of SKILL_CATEGORIES, e.g. 'tech'.
+
+    Returns:
+        dict: Total count for each skill, keyed by its display spelling.
+    """
+    with get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(read_sql_file(GET_SKILL_TOTALS_QUERY_PATH), {'category': category})
+        return {skill: int(total) for skill, total in cursor.fetchall()}
+
+
+def main():
+    try:
+        with metrics.stage("skill_counts"):
+            create_skill_count_tables()
+            update_job_skill_counts()
+    finally:
+        metrics.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from analysis import description_analysis as da
+
+
+# Sparse jobs x skills matrices saved next to the analytics artifact
+SKILL_MATRIX_PATH = "skill_matrix.npz"
+
+
+class SkillMatrix:
+    """
+    Sparse jobs x skills count matrix for one skill category.
+
+    Row i holds the skill counts of the listing with job id `ids[i]`, column j the counts of
+    `skills[j]`. Filtered counts, co-occurrence and per-group breakdowns are sparse matrix
+    products over a row mask, so no description is tokenised again.
+
+    Parameters:
+    -----------
+    matrix : scipy.sparse.csr_matrix
+        Counts of shape (len(ids), len(skills))
+
+    skills : list of str
+        Skill display spellings, one per column
+
+    ids : np.ndarray
+        Job id of each row
+    """
+
+    def __init__(self, matrix, skills, ids):
+        self.matrix = sparse.csr_matrix(matrix)
+        self.skills = list(skills)
+        self.ids = np.asarray(ids, dtype=np.int64)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def _rows(self, mask):
+        # Indicator row vector selecting the masked listings, all listings if mask is None
+        if mask is None:
+            return np.ones(len(self), dtype=np.int64)
+        mask = np.asarray(mask, dtype=bool)
+        if mask.shape != (len(self),):
+            raise ValueError(f"Mask has shape {mask.shape}, expected ({len(self)},)")
+        return mask.astype(np.int64)
+
+    def align(self, data_frame, id_column='id'):
+        """
+        Reorders a DataFrame of listings so its rows line up with the matrix rows.
+
+        Listings missing from `data_frame` become rows of NaN, so any mask built from the
+        result is False for them.
+        """
+        return data_frame.drop_duplicates(id_column).set_index(id_column).reindex(self.ids)
+
+    def counts(self, mask=None):
+        """
+        Total count of each skill over the listings selected by `mask`.
+
+        Parameters:
+        -----------
+        mask=None : array-like of bool
+            One value per matrix row, all listings if None
+
+        Returns:
+        --------
+        dict
+            Counts keyed by skill display spelling, skills that never occur are left out
+        """
+        totals = self.matrix.T @ self._rows(mask)
+        return {skill: int(total) for skill, total in zip(self.skills, totals) if total}
+
+    def listing_counts(self, mask=None):
+        """Number of selected listings mentioning each skill at least once."""
+        mentions = (self.matrix > 0).astype(np.int64)
+        totals = mentions.T @ self._rows(mask)
+        return {skill: int(total) for skill, total in zip(self.skills, totals) if total}
+
+    def co_occurrence(self, mask=None, skills=None):
+        """
+        Number of selected listings mentioning each pair of skills.
+
+        Parameters:
+        -----------
+        mask=None : array-like of bool
+            One value per matrix row, all listings if None
+
+        skills=None : list of str
+            Restrict the result to these skills, e.g. the top 20
+
+        Returns:
+        --------
+        pd.DataFrame
+            Symmetric skills x skills frame, the diagonal holds each skill's listing count
+        """
+        mentions = (self.matrix > 0).astype(np.int64)
+        if mask is not None:
+            mentions = mentions[np.asarray(mask, dtype=bool)]
+
+        labels = self.skills
+        if skills is not None:
+            positions = [self.skills.index(skill) for skill in skills]
+            mentions = mentions[:, positions]
+            labels = list(skills)
+
+        pairs = (mentions.T @ mentions).toarray()
+        return pd.DataFrame(pairs, index=labels, columns=labels)
+
+    def breakdown(self, labels, mask=None):
+        """
+        Skill counts per group of listings, e.g. per location.
+
+        Parameters:
+        -----------
+        labels : array-like
+            Group label of each matrix row, rows with a missing label are skipped
+
+        mask=None : array-like of bool
+            Further restricts the listings counted
+
+        Returns:
+        --------
+        pd.DataFrame
+            Groups x skills frame of counts
+        """
+        labels = pd.Series(np.asarray(labels, dtype=object))
+        keep = labels.notna().to_numpy() & self._rows(mask).astype(bool)
+        codes, groups = pd.factorize(labels[keep], sort=True)
+
+        # Sparse group x listing indicator, so the breakdown is one matrix product
+        indicator = sparse.csr_matrix(
+            (np.ones(len(codes), dtype=np.int64), (codes, np.flatnonzero(keep))),
+            shape=(len(groups), len(self))
+        )
+        totals = (indicator @ self.matrix).toarray()
+        return pd.DataFrame(totals, index=groups, columns=self.skills)
+
+
+def build_skill_matrices(data_frame, word_lists, column_name='description', id_column='id'):
+    """
+    Builds one SkillMatrix per skill category from a DataFrame of listings.
+
+    Each description is tokenised once, like in `process_data_frame`, and counted against
+    every category. Rows follow the DataFrame's row order and listings without a description
+    get an empty row, so the matrices stay aligned with `data_frame`.
+
+    Parameters:
+    -----------
+    data_frame : pd.DataFrame
+        Listings with id and description columns
+
+    word_lists : dict
+        Keyword list for each category, e.g. {'tech': tech, 'professional': non_tech_skills}
+
+    Returns:
+    --------
+    dict
+        SkillMatrix for each category
+    """
+    if column_name not in data_frame.columns:
+        raise ValueError(f"Column '{column_name}' not found in DataFrame")
+
+    tries = {category: da.compile_word_category(tuple(words)) for category, words in word_lists.items()}
+    # Duplicate spellings share one column, in the order of the word list
+    skills = {category: list(dict.fromkeys(words)) for category, words in word_lists.items()}
+    columns = {category: {skill: index for index, skill in enumerate(names)} for category, names in skills.items()}
+    entries = {category: ([], [], []) for category in word_lists}
+
+    for row, text in enumerate(data_frame[column_name]):
+        if pd.isna(text):
+            continue
+        tokens = da.tokenize_description(str(text))
+        for category, word_trie in tries.items():
+            rows, cols, counts = entries[category]
+            for skill, count in word_trie.count(tokens).items():
+                rows.append(row)
+                cols.append(columns[category][skill])
+                counts.append(count)
+
+    ids = data_frame[id_column].to_numpy()
+    return {
+        category: SkillMatrix(
+            sparse.csr_matrix((counts, (rows, cols)), shape=(len(data_frame), len(skills[category])), dtype=np.int32),
+            skills[category],
+            ids
+        )
+        for category, (rows, cols, counts) in entries.items()
+    }
+
+
+def save_skill_matrices(matrices, source_hash, matrix_path=SKILL_MATRIX_PATH):
+    """Writes skill matrices to a compressed .npz file tagged with the source data hash."""
+    arrays = {'source_hash': np.array(source_hash)}
+    for category, skill_matrix in matrices.items():
+        csr = skill_matrix.matrix
+        arrays[f'{category}__data'] = csr.data
+        arrays[f'{category}__indices'] = csr.indices
+        arrays[f'{category}__indptr'] = csr.indptr
+        arrays[f'{category}__shape'] = np.array(csr.shape)
+        arrays[f'{category}__skills'] = np.array(skill_matrix.skills, dtype=str)
+        arrays[f'{category}__ids'] = skill_matrix.ids
+
+    np.savez_compressed(matrix_path, **arrays)
+    print(f"Skill matrices written to '{matrix_path}'.")
+
+
+def load_skill_matrices(matrix_path=SKILL_MATRIX_PATH, source_hash=None):
+    """
+    Loads skill matrices written by `save_skill_matrices`.
+
+    Returns:
+    --------
+    dict or None
+        SkillMatrix for each category, or None if the file is missing or built from other data
+    """
+    try:
+        with np.load(matrix_path, allow_pickle=False) as arrays:
+            if source_hash and str(arrays['source_hash']) != source_hash:
+                return None
+
+            categories = {name.split('__')[0] for name in arrays.files if name != 'source_hash'}
+            return {
+                category: SkillMatrix(
+                    sparse.csr_matrix(
+                        (arrays[f'{category}__data'], arrays[f'{category}__indices'], arrays[f'{category}__indptr']),
+                        shape=tuple(arrays[f'{category}__shape'])
+                    ),
+                    arrays[f'{category}__skills'].tolist(),
+                    arrays[f'{category}__ids']
+                )
+                for category in categories
+            }
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
@@ -4,4 +4,5 @@ SELECT
 FROM
     student.data_engineer_jobs
 WHERE
-    cleaned_location IS NOT NULL
\ No newline at end of file
+    cleaned_location IS NOT NULL
+    AND country = 'gb'
\ No newline at end of file
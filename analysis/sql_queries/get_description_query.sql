@@ -2,3 +2,5 @@ SELECT
     description
 FROM
     student.data_engineer_jobs
+WHERE
+    country = 'gb'
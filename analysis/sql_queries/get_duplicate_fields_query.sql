@@ -0,0 +1,7 @@
+SELECT 
+    id,
+    title,
+    company,
+    description
+FROM
+    student.data_engineer_jobs
@@ -2,4 +2,6 @@ SELECT
     id,
     location
 FROM 
-    student.data_engineer_jobs
\ No newline at end of file
+    student.data_engineer_jobs
+WHERE
+    country = 'gb'
\ No newline at end of file
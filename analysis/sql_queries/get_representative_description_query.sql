@@ -0,0 +1,7 @@
+SELECT 
+    description
+FROM
+    student.data_engineer_jobs
+WHERE
+    country = 'gb'
+    AND (cluster_id IS NULL OR id = cluster_id)
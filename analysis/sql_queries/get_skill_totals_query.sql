@@ -0,0 +1,14 @@
+SELECT 
+    counts.skill,
+    SUM(counts.count) AS total
+FROM
+    student.job_skill_counts AS counts
+JOIN
+    student.data_engineer_jobs AS jobs
+    ON jobs.id = counts.job_id
+WHERE
+    counts.category = %(category)s
+    AND jobs.country = 'gb'
+    AND (jobs.cluster_id IS NULL OR jobs.id = jobs.cluster_id)
+GROUP BY
+    counts.skill
@@ -9,4 +9,6 @@ SELECT
     redirect_url,
     created
 FROM
-    student.data_engineer_jobs
\ No newline at end of file
+    student.data_engineer_jobs
+WHERE
+    country = 'gb'
\ No newline at end of file
@@ -0,0 +1,11 @@
+SELECT 
+    jobs.id,
+    jobs.description
+FROM
+    student.data_engineer_jobs AS jobs
+LEFT JOIN
+    student.job_skill_processed AS processed
+    ON processed.job_id = jobs.id
+WHERE
+    processed.job_id IS NULL
+    OR processed.skill_version <> %(skill_version)s
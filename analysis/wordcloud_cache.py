@@ -0,0 +1,164 @@
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from analysis import description_analysis as da
+
+
+# Directory holding rendered word cloud images
+WORDCLOUD_CACHE_PATH = os.getenv("WORDCLOUD_CACHE_PATH", ".wordcloud_cache")
+
+# Least recently used images are evicted once the cache holds more than this many bytes
+WORDCLOUD_CACHE_MAX_BYTES = int(os.getenv("WORDCLOUD_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+# Parameters every render uses unless overridden
+DEFAULT_RENDER_PARAMS = {'width': 800, 'height': 400, 'image_format': 'png'}
+
+
+def render_key(frequencies, **params):
+    """
+    Returns the content address of a word cloud: a hash of its frequencies and render parameters.
+
+    The same counts rendered with the same parameters always give the same key, so an image
+    is only rendered once however many pages or sessions ask for it.
+    """
+    payload = json.dumps(
+        {'frequencies': sorted((str(word), int(count)) for word, count in frequencies.items()), 'params': params},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_wordcloud_bytes(frequencies, width=800, height=400, image_format='png', font_path=da.WORDCLOUD_FONT_PATH):
+    """Renders a word cloud with the bundled font and returns the encoded image bytes."""
+    image = da.wordcloud_from_frequencies(frequencies, width, height, font_path).to_image()
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format.upper())
+    return buffer.getvalue()
+
+
+class WordCloudCache:
+    """
+    On-disk cache of rendered word cloud images, keyed by `render_key`, rendered in the background.
+
+    `get` returns cached bytes immediately, or queues a render on a single background worker
+    and returns None so the caller can show a placeholder until the image is ready. Each image
+    is stored as one file named by its key, and the least recently used files are deleted once
+    the cache grows past `max_bytes`.
+
+    Parameters:
+    -----------
+    cache_path=WORDCLOUD_CACHE_PATH : str
+        Directory the images are stored in
+
+    max_bytes=WORDCLOUD_CACHE_MAX_BYTES : int
+        Size the cache is trimmed back to after each new image
+    """
+
+    def __init__(self, cache_path=WORDCLOUD_CACHE_PATH, max_bytes=WORDCLOUD_CACHE_MAX_BYTES):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.pending = {}
+        # One worker, so renders never compete with the app for more than one core
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wordcloud")
+        os.makedirs(cache_path, exist_ok=True)
+
+    def _path(self, key, image_format):
+        return os.path.join(self.cache_path, f"{key}.{image_format}")
+
+    def read(self, key, image_format='png'):
+        """Returns the cached image bytes for a key, or None if it has not been rendered."""
+        path = self._path(key, image_format)
+        try:
+            with open(path, "rb") as file:
+                image_bytes = file.read()
+        except FileNotFoundError:
+            return None
+        # Access time is tracked with the modification time, which every filesystem updates
+        os.utime(path)
+        return image_bytes
+
+    def write(self, key, image_bytes, image_format='png'):
+        """Stores image bytes under a key, then evicts least recently used images over the size limit."""
+        path = self._path(key, image_format)
+        # Write then rename so a reader never sees a half-written image
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(image_bytes)
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def evict(self):
+        """Deletes least recently used images until the cache fits in `max_bytes`."""
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.cache_path):
+                if name.endswith(".tmp"):
+                    continue
+                stat = os.stat(os.path.join(self.cache_path, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total_bytes = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_path, name))
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+
+    def _render(self, key, frequencies, params):
+        try:
+            self.write(key, render_wordcloud_bytes(frequencies, **params), params['image_format'])
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def get(self, frequencies, wait=False, **params):
+        """
+        Returns the image for `frequencies`, rendering it in the background if it is not cached.
+
+        Parameters:
+        -----------
+        frequencies : dict
+            Count for each word or phrase
+
+        wait=False : bool
+            Block until the image is rendered instead of returning None
+
+        **params
+            Render parameters overriding DEFAULT_RENDER_PARAMS, e.g. width=1200 or image_format='webp'
+
+        Returns:
+        --------
+        bytes or None
+            Encoded image, or None while a render is still in progress
+        """
+        if not frequencies:
+            return None
+
+        params = {**DEFAULT_RENDER_PARAMS, **params}
+        key = render_key(frequencies, **params)
+
+        image_bytes = self.read(key, params['image_format'])
+        if image_bytes is not None:
+            return image_bytes
+
+        # Only one render is queued per key, however many reruns ask for it meanwhile
+        with self.lock:
+            future = self.pending.get(key)
+            if future is None:
+                future = self.executor.submit(self._render, key, dict(frequencies), params)
+                self.pending[key] = future
+
+        if not wait:
+            return None
+        future.result()
+        return self.read(key, params['image_format'])
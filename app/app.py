@@ -1,38 +1,132 @@
 import streamlit as st
-import seaborn as sns
 import pandas as pd
+import numpy as np
+import math
 import pydeck as pdk
 import os
 import sys
 import plotly.graph_objects as go 
-from wordcloud import WordCloud
-from PIL import ImageFont
 
 # Append path to recognise analysis module, as python won't recognise without
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-# Import user-made analysis functions 
-from analysis import description_analysis as da
-# Import list of technologies
-from analysis.resources.technologies import tech
-# Import list of professional skills
-from analysis.resources.non_tech_skills import non_tech_skills
+# Import user-made analytics builder, used to load precomputed counts and aggregates
+from analysis import build_analytics as ba
+# Import dataset loader, reads Parquet columns when the dataset has been exported
+from analysis import dataset_export as dx
+# Import sparse jobs x skills matrices, used for skill counts filtered by location and salary
+from analysis import skill_matrix as sm
+# Import local full-text search index, used to search the Raw Data page
+from analysis import job_search as js
+# Import pre-aggregated cube, sliced by the filters on the Skills and Salary pages
+from analysis import analytics_cube as ac
+# Import word cloud render cache, images are rendered in the background and reused across sessions
+from analysis import wordcloud_cache as wcc
+
+# Hash of the source data, recomputed only when the data files are modified
+@st.cache_data
+def get_source_hash(modified_time):
+    return dx.source_hash()
+
+
+# Load only the requested columns of the dataset, cached until the source data changes
+@st.cache_data
+def load_data(source_hash, columns=None):
+    return dx.load_dataset(columns)
+
+
+# Load precomputed analytics, building them in-process if the artifact is missing or stale
+@st.cache_data
+def load_analytics(source_hash):
+    artifact = ba.load_analytics_artifact(ba.ARTIFACT_PATH, source_hash)
+    if artifact is None:
+        artifact = ba.build_analytics(load_data(source_hash, ba.ANALYTICS_COLUMNS))
+    return artifact
+
+
+# Load the jobs x skills matrices built with the artifact, None if missing or built from other data
+@st.cache_resource
+def load_skill_matrices(source_hash):
+    return sm.load_skill_matrices(sm.SKILL_MATRIX_PATH, source_hash)
+
+
+# Load the location x skill x salary band x week cube, None if missing or built from other data
+@st.cache_resource
+def load_cube(source_hash):
+    return ac.load_cube(ac.CUBE_PATH, source_hash)
+
+
+# Cube dimensions of each skill matrix row, computed once so filter changes only rebuild the mask
+@st.cache_resource
+def load_matrix_dimensions(source_hash):
+    listings = load_skill_matrices(source_hash)['tech'].align(
+        load_data(source_hash, ['id', 'location', 'salary_min', 'created'])
+    )
+    return ac.listing_dimensions(listings)
+
+
+# Filter widgets for pages sliced from the cube, returns keyword filters for the cube queries
+def cube_filters(cube, key, with_locations=True):
+    filters = {}
+    filter_columns = st.columns(3 if with_locations else 2)
+
+    if with_locations:
+        filters['locations'] = filter_columns[0].multiselect(
+            "Filter by location:", cube.location_names(), key=f"{key}_locations"
+        )
+
+    # A filter left at its full range is not applied, so listings without a salary stay included
+    bands = cube.salary_bands()
+    if len(bands) > 1:
+        salary_range = filter_columns[-2].select_slider(
+            "Minimum salary band:", options=bands, value=(bands[0], bands[-1]),
+            format_func=ac.salary_band_label, key=f"{key}_salary"
+        )
+        if salary_range != (bands[0], bands[-1]):
+            filters['salary_range'] = salary_range
+
+    weeks = cube.weeks()
+    if len(weeks) > 1:
+        week_range = filter_columns[-1].select_slider(
+            "Weeks listed:", options=weeks, value=(weeks[0], weeks[-1]), key=f"{key}_weeks"
+        )
+        if week_range != (weeks[0], weeks[-1]):
+            filters['week_range'] = week_range
+
+    return filters
 
-# Store CSV path
-data_engineering_csv ="cleaned_data.csv"
 
-# Load data from CSV
-data_engineer_df = pd.read_csv(data_engineering_csv)
+# One render cache and background worker shared by every session
+@st.cache_resource
+def get_wordcloud_cache():
+    return wcc.WordCloudCache()
 
 
+# Show the word cloud for a set of counts, or the bundled backup image while it is being rendered
+def show_wordcloud(frequencies, backup_image_path):
+    if not frequencies:
+        st.info("No matches in the listings selected by the filters.")
+        return
 
+    image_bytes = get_wordcloud_cache().get(frequencies)
+    if image_bytes is not None:
+        st.image(image_bytes, use_container_width=True)
+    else:
+        st.image(backup_image_path, use_container_width=True)
+        st.caption("An up-to-date word cloud is being rendered and will show when the page next updates.")
 
-# Process description data for word analysis
-processed_descriptions = da.process_data_frame(data_engineer_df)
 
-# Call function to count most common techs in processed description data
-tech_count = da.multi_count_word_category(processed_descriptions, tech)
-# Count professional skills
-skill_count = da.multi_count_word_category(processed_descriptions, non_tech_skills)
+# Build the search index over titles and descriptions once per version of the data
+@st.cache_resource
+def load_search_index(source_hash):
+    return js.InvertedIndex(load_data(source_hash))
+
+
+source_hash = get_source_hash(dx.source_modified_time())
+analytics = load_analytics(source_hash)
+
+# Counts of technologies and professional skills mentioned in descriptions
+tech_count = analytics['tech_count']
+skill_count = analytics['skill_count']
 
 
 
@@ -81,9 +175,9 @@ if page == "Home":
     )
 
     # Queries for stats section
-    total_job_listings = data_engineer_df['id'].nunique()
-    avg_salary = round(data_engineer_df['salary_min'].mean())
-    most_common_tech = max(tech_count, key=tech_count.get) # Return highest counted tech in tech count dictionary
+    total_job_listings = analytics['stats']['total_job_listings']
+    avg_salary = analytics['stats']['avg_salary']
+    most_common_tech = analytics['stats']['most_common_tech'] # Highest counted tech in tech count dictionary
 
 
     # Key Stats Section
@@ -112,6 +206,26 @@ elif page == "Skills Trends":
     - Which professional skills are most valued?
     """)
 
+    # --------------------------
+    # Section: Filters applied to the skill counts
+    # --------------------------
+    cube = load_cube(source_hash)
+    skill_matrices = load_skill_matrices(source_hash)
+    skill_filters = {}
+    skill_mask = None
+    if cube is not None:
+        skill_filters = cube_filters(cube, "skills")
+
+        # Counts are sliced from the pre-aggregated cube, the listings are never regrouped
+        tech_count = cube.skill_counts('tech', **skill_filters)
+        skill_count = cube.skill_counts('professional', **skill_filters)
+        matching_listings = int(cube.cells(**skill_filters)['listing_count'].sum())
+        st.caption(f"{matching_listings} listings match the filters.")
+
+        if skill_matrices is not None and skill_filters:
+            # Pairs of skills are not in the cube, so the matrix rows are masked with the same filters
+            skill_mask = ac.filter_mask(load_matrix_dimensions(source_hash), **skill_filters)
+
     wordcloud_tabs = st.tabs(["Technologies", "Professional Skills"])
 
     # --------------------------
@@ -128,9 +242,8 @@ elif page == "Skills Trends":
         st.markdown("""
             This word cloud shows the most frequently mentioned **technologies** aggregated across job descriptions.  
         """)
-        # world cloud not working on cloud
-        # tech_word_cloud = da.test_wordcloud_image(processed_descriptions, tech)
-        st.image("app/app_images/tech_wordcloud.png", use_container_width=True)  # Display tech word cloud
+        # Rendered from the current counts, the static image is only shown until the render is cached
+        show_wordcloud(tech_count, "app/app_images/tech_wordcloud.png")  # Display tech word cloud
 
         st.markdown("""
             **Method**: The cloud is generated by counting words from job descriptions against a prebuilt list of the most common technologies.
@@ -171,6 +284,37 @@ elif page == "Skills Trends":
         # Show chart in Streamlit
         st.plotly_chart(fig, key="tech_chart")
 
+        if skill_matrices is not None:
+            # --------------------------
+            # Section: Heatmap of Technologies Mentioned Together
+            # --------------------------
+            st.markdown("#### Technologies Mentioned Together")
+
+            top_tech = names[:15]
+            co_occurrence = skill_matrices['tech'].co_occurrence(skill_mask, top_tech)
+
+            fig = go.Figure(data=[go.Heatmap(
+                z=co_occurrence.values,
+                x=top_tech,
+                y=top_tech,
+                colorscale='Greens',
+                hovertemplate="%{x} & %{y}: %{z} listings<extra></extra>"
+            )])
+            fig.update_layout(title="", template='plotly_dark')
+            st.plotly_chart(fig, key="tech_co_occurrence_chart")
+
+            st.write("Number of listings mentioning both technologies, for the 15 most frequent technologies. The diagonal shows listings mentioning each technology.")
+
+        if cube is not None:
+            # --------------------------
+            # Section: Table of Top Technologies by Location
+            # --------------------------
+            st.markdown("#### Top Technologies by Location")
+
+            tech_by_location = cube.skill_breakdown('tech', **skill_filters)
+            top_location_names = cube.location_counts(**skill_filters)['location'].head(10)
+            st.dataframe(tech_by_location.reindex(index=top_location_names, columns=names[:10]).fillna(0).astype(int))
+
 
     # --------------------------
     # Tab: Professional Skills Analysis
@@ -188,10 +332,8 @@ elif page == "Skills Trends":
         This word cloud highlights the professional skills that are most valued by employers.
         Practice these skills and set yourself apart in a competitive job market!
         """)
-        # world cloud not generating on cloud
-        # skills_word_cloud = da.test_wordcloud_image(processed_descriptions, non_tech_skills)
-        # use back up worldcloud from local file
-        st.image("app/app_images/pro_skills_wordcloud.png", use_container_width=True)  
+        # Rendered from the current counts, the backup image from file is only shown until the render is cached
+        show_wordcloud(skill_count, "app/app_images/pro_skills_wordcloud.png")  
 
         
         
@@ -235,6 +377,20 @@ elif page == "Salary & Location Insights":
     st.title("Salary & Location Insights")
     st.write("Discover how salaries breakdown across data engineering jobs and how job locations are distributed across the UK.")
 
+    # --------------------------
+    # Section: Cross filters, answered by slicing the pre-aggregated cube
+    # --------------------------
+    cube = load_cube(source_hash)
+    cube_selection = {}
+    if cube is not None:
+        selected_tech = st.selectbox(
+            "Only listings mentioning technology:",
+            ["Any technology"] + sorted(tech_count, key=tech_count.get, reverse=True)
+        )
+        if selected_tech != "Any technology":
+            cube_selection.update(category='tech', skill=selected_tech)
+        cube_selection.update(cube_filters(cube, "salary", with_locations=False))
+
     tab1, tab2 = st.tabs(["Salaries", "Locations"])
 
 
@@ -249,16 +405,26 @@ elif page == "Salary & Location Insights":
      
 
 
-        # Prepare salary data
-        salary_data = data_engineer_df['salary_min']
-
-        # Create histogram
-        fig = go.Figure(data=[go.Histogram(
-            x=salary_data,
-            nbinsx=40,
-            marker_color=adzuna_green,
-            hoverinfo='x+y'
-        )])
+        if cube is not None:
+            # Listing counts per salary band, already binned in the cube
+            salary_band_counts = cube.salary_band_counts(**cube_selection)
+            fig = go.Figure(data=[go.Bar(
+                x=[ac.salary_band_label(band) for band in salary_band_counts.index],
+                y=salary_band_counts.values,
+                marker_color=adzuna_green,
+                hoverinfo='x+y'
+            )])
+        else:
+            # Prepare salary data
+            salary_data = dx.select_representatives(load_data(source_hash, ['id', 'salary_min', 'cluster_id']))['salary_min']
+
+            # Create histogram
+            fig = go.Figure(data=[go.Histogram(
+                x=salary_data,
+                nbinsx=40,
+                marker_color=adzuna_green,
+                hoverinfo='x+y'
+            )])
 
         # Style the layout
         fig.update_layout(
@@ -281,26 +447,21 @@ elif page == "Salary & Location Insights":
 
         st.subheader("Average Salaries by Location")
 
-        # Calculate the average minimum salary and count of listings by location
-        salary_by_location = (
-            data_engineer_df.groupby('location')
-            .agg(
-                salary_min_mean=('salary_min', 'mean'),
-                lat=('lat', 'first'),
-                lon=('lon', 'first'),
-                job_count=('salary_min', 'count')
-            )
-            .reset_index()
-        )
+        # Average minimum salary and count of listings by location, from the cube when it has been built
+        if cube is not None:
+            salary_by_location = cube.salary_by_location(**cube_selection)
+        else:
+            salary_by_location = pd.DataFrame(analytics['salary_by_location'])
         # Round and format salary for tooltip
         salary_by_location['salary_label'] = salary_by_location['salary_min_mean'].round(0).astype(int).apply(lambda x: f"£{x:,}")
 
-        # Set up the slider for minimum number of job listings
+        # Set up the slider for minimum number of job listings, filters can leave few or no listings
+        max_jobs = int(salary_by_location['job_count'].max()) if len(salary_by_location) else 1
         min_jobs = st.slider(
             "Select minimum number of job listings per location:",
             min_value=1,
-            max_value=int(salary_by_location['job_count'].max()),
-            value=5,
+            max_value=max(max_jobs, 2),
+            value=min(5, max_jobs),
             step=1
         )
 
@@ -419,8 +580,10 @@ elif page == "Salary & Location Insights":
         # -------------------------
 
         # Get top 10 locations by job count
-        location_counts = data_engineer_df['location'].value_counts().sort_values(ascending=False)
-        top_locations = location_counts.head(10)
+        if cube is not None:
+            top_locations = cube.location_counts(**cube_selection).set_index('location')['count'].head(10)
+        else:
+            top_locations = pd.Series(analytics['top_locations'])
 
         # Create the bar chart using Plotly
         fig = go.Figure(data=[go.Bar(
@@ -447,12 +610,11 @@ elif page == "Salary & Location Insights":
         st.markdown("<br><br>", unsafe_allow_html=True)  # Two lines of space
 
 
-        # Calculate frequency of each location
-        location_counts = (
-            data_engineer_df.groupby(['lat', 'lon'])
-            .agg(count=('lat', 'size'), location=('location', 'first'))
-            .reset_index()
-        )
+        # Frequency of each mapped location
+        if cube is not None:
+            location_counts = cube.location_counts(**cube_selection).dropna(subset=['lat', 'lon'])
+        else:
+            location_counts = pd.DataFrame(analytics['location_counts'])
 
         # Add a title above the map
         st.subheader(" Map of Data Engineer U.K. Locations")
@@ -493,9 +655,26 @@ elif page == "Salary & Location Insights":
 
 elif page == "Raw Data":
     st.title("Raw Data Exploration")
-    st.write("Interact with the dataset directly!")
-    # Display the full dataframe (this could be filtered based on user input)
-    st.dataframe(data_engineer_df)
+    st.write("Interact with the dataset directly! Search titles and descriptions, or browse every listing page by page.")
+
+    raw_data = load_data(source_hash)
+    search_text = st.text_input("Search listings:", placeholder="e.g. airflow python -azure")
+
+    # Ranked matches from the inverted index, or every row in order when there is no search
+    if search_text.strip():
+        matched_rows = load_search_index(source_hash).search(search_text)
+    else:
+        matched_rows = np.arange(len(raw_data))
+
+    page_count = max(1, math.ceil(len(matched_rows) / js.SEARCH_PAGE_SIZE))
+    page_number = st.number_input(
+        f"Page (of {page_count}):", min_value=1, max_value=page_count, value=1, step=1,
+        key=f"raw_data_page_{search_text}"  # Back to the first page for each new search
+    )
+    st.caption(f"{len(matched_rows)} matching listings.")
+
+    # Only the current page of matches is sent to the browser
+    st.dataframe(raw_data.iloc[js.paginate(matched_rows, page_number - 1)])
 
 
 
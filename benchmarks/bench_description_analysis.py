@@ -0,0 +1,136 @@
+"""
+Scaling benchmark for the description_analysis hot paths.
+
+Generates synthetic description corpora from the technology and professional skill
+vocabularies and times process_data_frame, top_words_counter and multi_count_word_category
+at each corpus size. Every size runs in a fresh process so peak RSS is measured cleanly.
+Results are saved as JSON tagged with the current commit so runs can be compared.
+
+Run from the repository root:
+    python -m benchmarks.bench_description_analysis --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from analysis.resources.non_tech_skills import non_tech_skills
+from analysis.resources.technologies import tech
+
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+RESULTS_DIRECTORY = "benchmarks/results"
+
+FILLER_WORDS = (
+    "the role will you we our team data pipelines build design maintain experience with strong "
+    "working knowledge of modern platform cloud business stakeholders deliver scalable reliable "
+    "engineering solutions hybrid office salary benefits apply today senior junior opportunity"
+).split()
+
+
+def generate_descriptions(size, seed=42):
+    """Generate `size` synthetic job descriptions mixing filler words and vocabulary terms."""
+    rng = random.Random(seed)
+    vocabulary = tech + non_tech_skills
+    descriptions = []
+    for _ in range(size):
+        words = [
+            rng.choice(vocabulary) if rng.random() < 0.15 else rng.choice(FILLER_WORDS)
+            for _ in range(rng.randint(60, 140))
+        ]
+        descriptions.append(" ".join(words) + ".")
+    return descriptions
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run_size(size):
+    """Benchmark every stage on one corpus size, run inside a fresh worker process."""
+    import pandas as pd
+    from analysis import description_analysis as da
+
+    data_frame = pd.DataFrame({"description": generate_descriptions(size)})
+    results = {"documents": size, "baseline_rss_mb": peak_rss_mb()}
+
+    tokens, seconds = timed(da.process_data_frame, data_frame)
+    results["process_data_frame"] = {
+        "seconds": round(seconds, 3),
+        "tokens": len(tokens),
+        "tokens_per_sec": round(len(tokens) / seconds),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    _, seconds = timed(da.top_words_counter, tokens)
+    results["top_words_counter"] = {
+        "seconds": round(seconds, 3),
+        "tokens_per_sec": round(len(tokens) / seconds),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    _, seconds = timed(da.multi_count_word_category, tokens, tech)
+    results["multi_count_word_category"] = {
+        "seconds": round(seconds, 3),
+        "tokens_per_sec": round(len(tokens) / seconds),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark description_analysis on growing synthetic corpora.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--output", help=f"Path for the JSON results, defaults to {RESULTS_DIRECTORY}/<commit>.json")
+    args = parser.parse_args()
+
+    commit = current_commit()
+    report = {
+        "benchmark": "description_analysis",
+        "commit": commit,
+        "run_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+
+    # A fresh process per size keeps peak RSS from one size leaking into the next
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        with context.Pool(1) as pool:
+            result = pool.apply(run_size, (size,))
+        report["results"].append(result)
+        print(json.dumps(result))
+
+    output_path = args.output or os.path.join(RESULTS_DIRECTORY, f"description_analysis-{commit}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to '{output_path}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Extraction throughput benchmark against the local Adzuna API stand-in.
+
+Measures sequential and concurrent page fetching, and optionally the database load
+into a local PostgreSQL configured through the usual DB_* environment variables.
+
+Run from the repository root:
+    python -m benchmarks.bench_extraction --pages 100 --latency-ms 150
+    python -m benchmarks.bench_extraction --pages 100 --with-db
+    python -m benchmarks.bench_extraction --pages 100 --full-crawl
+"""
+import argparse
+import json
+import threading
+import time
+
+from benchmarks.mock_adzuna_server import start_mock_server
+from extraction import api_extraction
+from extraction.failed_pages import FailedPageLog
+from extraction.rate_limiter import AdaptiveTokenBucket
+from extraction.scheduler import SearchJob
+
+
+def percentile(values, fraction):
+    """Return the value at `fraction` (0-1) of the sorted values, nearest-rank method."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LatencyRecorder:
+    """Records the elapsed time of every response made through the shared session."""
+
+    def __init__(self):
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def __call__(self, response, *args, **kwargs):
+        with self.lock:
+            self.latencies.append(response.elapsed.total_seconds())
+        return response
+
+    def reset(self):
+        with self.lock:
+            self.latencies = []
+
+
+def summarise(name, pages, rows, seconds, latencies):
+    """Build the result record for one benchmark run."""
+    return {
+        "name": name,
+        "pages": pages,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "pages_per_sec": round(pages / seconds, 2),
+        "rows_per_sec": round(rows / seconds, 2),
+        "requests": len(latencies),
+        "latency_p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+def bench_sequential(page_numbers, recorder):
+    recorder.reset()
+    start = time.perf_counter()
+    data = []
+    for page_number in page_numbers:
+        data.extend(api_extraction.extract_adzuna_data(page_number) or [])
+    seconds = time.perf_counter() - start
+    return data, summarise("sequential fetch", len(page_numbers), len(data), seconds, recorder.latencies)
+
+
+def bench_concurrent(page_numbers, recorder, max_workers, requests_per_second):
+    recorder.reset()
+    rate_limiter = AdaptiveTokenBucket(requests_per_second)
+    failed_pages = FailedPageLog()
+    start = time.perf_counter()
+    data = api_extraction.extract_adzuna_pages(
+        page_numbers, max_workers=max_workers, rate_limiter=rate_limiter, failed_pages=failed_pages
+    )
+    seconds = time.perf_counter() - start
+    result = summarise("concurrent fetch", len(page_numbers), len(data), seconds, recorder.latencies)
+    # With --throttle-rate or --error-rate set, shows how much the retries recovered and where the rate settled
+    result["failed_pages"] = len(failed_pages)
+    result["final_requests_per_sec"] = round(rate_limiter.rate, 2)
+    return data, result
+
+
+def bench_full_crawl(server, recorder, max_workers, requests_per_second, total_results):
+    # Imported here so the page benchmarks do not need the sharding module
+    from extraction import sharding
+
+    # Cap the mock like the live API, so the crawl has to shard to get past it
+    server.max_page_depth = sharding.MAX_PAGE_DEPTH
+    recorder.reset()
+    rate_limiter = AdaptiveTokenBucket(requests_per_second)
+    failed_pages = FailedPageLog()
+    start = time.perf_counter()
+    data, _ = sharding.crawl_query_space(
+        [SearchJob(api_extraction.DEFAULT_COUNTRY, api_extraction.DEFAULT_QUERY)],
+        max_workers=max_workers, rate_limiter=rate_limiter, failed_pages=failed_pages
+    )
+    seconds = time.perf_counter() - start
+    result = summarise("full crawl", len(recorder.latencies), len(data), seconds, recorder.latencies)
+    # Listings missed because they match no shard, e.g. no salary or a country-level location
+    result["listings_reported"] = total_results
+    result["coverage"] = round(len(data) / total_results, 4)
+    result["failed_entries"] = len(failed_pages)
+    return result
+
+
+def bench_insert(data):
+    api_extraction.create_table()
+    start = time.perf_counter()
+    inserted, skipped = api_extraction.insert_jobs_to_db(data)
+    seconds = time.perf_counter() - start
+    return {
+        "name": "database insert",
+        "rows": len(data),
+        "inserted": inserted,
+        "skipped": skipped,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(len(data) / seconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction throughput against a mock Adzuna API.")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=30.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-workers", type=int, default=api_extraction.MAX_CONCURRENT_REQUESTS)
+    parser.add_argument("--requests-per-second", type=float, default=50.0)
+    parser.add_argument("--with-db", action="store_true", help="Also benchmark inserts into the configured PostgreSQL")
+    parser.add_argument("--full-crawl", action="store_true",
+                        help="Also benchmark a sharded full crawl, with the mock capped at the page depth limit")
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, total_results=args.pages * 50
+    )
+    api_extraction.ADZUNA_BASE_URL = base_url
+
+    recorder = LatencyRecorder()
+    api_extraction.session.hooks["response"].append(recorder)
+
+    page_numbers = list(range(1, args.pages + 1))
+    results = []
+    try:
+        _, sequential = bench_sequential(page_numbers, recorder)
+        results.append(sequential)
+        data, concurrent = bench_concurrent(page_numbers, recorder, args.max_workers, args.requests_per_second)
+        results.append(concurrent)
+        if args.full_crawl:
+            results.append(bench_full_crawl(server, recorder, args.max_workers, args.requests_per_second, args.pages * 50))
+        if args.with_db:
+            results.append(bench_insert(data))
+    finally:
+        server.shutdown()
+
+    for result in results:
+        print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
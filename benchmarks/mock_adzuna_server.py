@@ -0,0 +1,277 @@
+"""
+Local stand-in for the Adzuna job search API, serving synthetic listings.
+
+Serves /v1/api/jobs/{country}/search/{page} and /v1/api/jobs/{country}/geodata with
+configurable latency, error rate and rate limiting, so extraction can be benchmarked without
+touching the live API. Searches honour the salary_min, salary_max, salary_include_unknown,
+location0..N and sort_by=date parameters and can be capped at a page depth, so full crawl sharding and the
+newest-first update crawl are exercised too.
+
+Run from the repository root:
+    python -m benchmarks.mock_adzuna_server --port 8765 --latency-ms 150 --error-rate 0.01 --throttle-rate 0.02
+
+Then point the extraction code at it:
+    ADZUNA_BASE_URL=http://127.0.0.1:8765/v1/api/jobs python extraction/run_extraction.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from analysis.resources.city_mapping import city_map
+from analysis.resources.non_tech_skills import non_tech_skills
+from analysis.resources.technologies import tech
+
+
+SEARCH_PATH_PATTERN = re.compile(r'^/v1/api/jobs/(?P<country>[a-z]{2})/search/(?P<page>\d+)$')
+GEODATA_PATH_PATTERN = re.compile(r'^/v1/api/jobs/(?P<country>[a-z]{2})/geodata$')
+
+# Share of listings with no salary, and with a location known only at country level, like real data
+NO_SALARY_RATE = 0.05
+COUNTRY_ONLY_LOCATION_RATE = 0.05
+
+TITLES = ["Data Engineer", "Senior Data Engineer", "Lead Data Engineer", "Analytics Engineer", "Data Platform Engineer"]
+FILLER = [
+    "We are looking for a", "to join our growing team.", "You will build and maintain pipelines using",
+    "Experience with", "is essential, and exposure to", "would be a bonus.", "The ideal candidate shows",
+    "and strong", "Hybrid working from our office in",
+]
+
+
+def synthetic_job(job_number, country):
+    """Build one deterministic Adzuna-shaped job listing for a job number."""
+    rng = random.Random(job_number)
+    city = city_map[rng.choice(list(city_map))]
+    salary = rng.randrange(35000, 110000, 2500)
+    words = []
+    for _ in range(rng.randint(12, 30)):
+        words.append(rng.choice(FILLER))
+        words.append(rng.choice(tech) if rng.random() < 0.6 else rng.choice(non_tech_skills))
+    words.append(city)
+    created = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=job_number * 7)
+    salary_max = salary + rng.randrange(0, 20000, 2500)
+
+    root_area = "UK" if country == "gb" else country.upper()
+    area = [root_area] if rng.random() < COUNTRY_ONLY_LOCATION_RATE else [root_area, city]
+    if rng.random() < NO_SALARY_RATE:
+        salary = salary_max = None
+
+    return {
+        "__CLASS__": "Adzuna::API::Response::Job",
+        "id": str(5_000_000_000 + job_number),
+        "title": rng.choice(TITLES),
+        "description": " ".join(words),
+        "company": {"display_name": f"Company {rng.randint(1, 400)}"},
+        "location": {"display_name": ", ".join(reversed(area)), "area": area},
+        "salary_min": salary,
+        "salary_max": salary_max,
+        "redirect_url": f"https://www.adzuna.co.uk/jobs/land/ad/{5_000_000_000 + job_number}",
+        "created": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+class MockAdzunaHandler(BaseHTTPRequestHandler):
+    """Request handler, behaviour is configured through attributes on the server."""
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        search = SEARCH_PATH_PATTERN.match(parsed.path)
+        geodata = GEODATA_PATH_PATTERN.match(parsed.path)
+        if not search and not geodata:
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        # Simulated network and server processing time
+        latency = max(0.0, server.rng_gauss(server.latency_ms, server.jitter_ms)) / 1000
+        time.sleep(latency)
+
+        roll = server.rng_random()
+        if roll < server.throttle_rate:
+            self._send_json(429, {"error": "Too many requests"}, {"Retry-After": str(server.retry_after)})
+            return
+        if roll < server.throttle_rate + server.error_rate:
+            self._send_json(500, {"error": "Internal server error"})
+            return
+
+        params = parse_qs(parsed.query)
+        country = (search or geodata).group("country")
+        matches = server.matching_jobs(country, params)
+
+        if geodata:
+            self._send_json(200, {"__CLASS__": "Adzuna::API::Response::Geodata", "locations": geodata_counts(matches, params)})
+            return
+
+        if params.get("sort_by", [""])[0] == "date":
+            # Newest first, otherwise listings come back oldest first
+            matches = matches[::-1]
+
+        page = int(search.group("page"))
+        results_per_page = int(params.get("results_per_page", ["10"])[0])
+        if server.max_page_depth and page > server.max_page_depth:
+            # Past the page depth limit a search returns nothing, however many listings match it
+            results = []
+        else:
+            first_job = (page - 1) * results_per_page
+            results = [job for _, job in matches[first_job:first_job + results_per_page]]
+        self._send_json(200, {"__CLASS__": "Adzuna::API::Response::JobSearchResults", "count": len(matches), "results": results})
+
+
+def location_filter(params):
+    """The location0, location1, ... filters of a request, as a list of area levels."""
+    area = []
+    while f"location{len(area)}" in params:
+        area.append(params[f"location{len(area)}"][0])
+    return area
+
+
+def job_matches(job, params, area):
+    """Whether a listing matches the salary and location filters of a request."""
+    if "salary_min" in params or "salary_max" in params:
+        salary = job["salary_min"]
+        if salary is None:
+            # Listings without a salary only match salary filters when asked for
+            if params.get("salary_include_unknown", ["0"])[0] != "1":
+                return False
+        elif "salary_min" in params and salary < float(params["salary_min"][0]):
+            return False
+        elif "salary_max" in params and salary > float(params["salary_max"][0]):
+            return False
+    return job["location"]["area"][:len(area)] == area
+
+
+def geodata_counts(matches, params):
+    """Listings in each sub-location one level below the request's location, like the geodata endpoint."""
+    area = location_filter(params)
+    # Without location filters the sub-locations are one level below the country
+    depth = len(area) + 1 if area else 2
+    counts = {}
+    for _, job in matches:
+        job_area = job["location"]["area"]
+        if len(job_area) >= depth:
+            key = tuple(job_area[:depth])
+            counts[key] = counts.get(key, 0) + 1
+    return [
+        {"location": {"area": list(key), "display_name": key[-1]}, "count": count}
+        for key, count in sorted(counts.items())
+    ]
+
+
+def start_mock_server(host="127.0.0.1", port=0, latency_ms=100.0, jitter_ms=20.0, error_rate=0.0,
+                      throttle_rate=0.0, retry_after=1, total_results=5000, seed=0, max_page_depth=None):
+    """
+    Start the mock API in a background thread.
+
+    Parameters:
+    -----------
+    port=0 : int
+        Port to listen on, 0 picks a free port
+
+    latency_ms=100.0 / jitter_ms=20.0 : float
+        Mean and standard deviation of the simulated response time
+
+    error_rate=0.0 : float
+        Fraction of requests answered with HTTP 500
+
+    throttle_rate=0.0 : float
+        Fraction of requests answered with HTTP 429 and a Retry-After header
+
+    total_results=5000 : int
+        Number of listings the search reports, pages past the end are empty
+
+    max_page_depth=None : int
+        Deepest page served for one search, like the live API, unlimited if None
+
+    Returns:
+    --------
+    tuple
+        (server, base_url), call server.shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), MockAdzunaHandler)
+    server.daemon_threads = True
+    server.latency_ms = latency_ms
+    server.jitter_ms = jitter_ms
+    server.error_rate = error_rate
+    server.throttle_rate = throttle_rate
+    server.retry_after = retry_after
+    server.total_results = total_results
+    server.max_page_depth = max_page_depth
+
+    # Listings are built once per country, searches filter them instead of rebuilding every page
+    listings = {}
+    listings_lock = threading.Lock()
+
+    def matching_jobs(country, params):
+        with listings_lock:
+            if country not in listings:
+                listings[country] = [(job_number, synthetic_job(job_number, country)) for job_number in range(total_results)]
+        area = location_filter(params)
+        return [(job_number, job) for job_number, job in listings[country] if job_matches(job, params, area)]
+
+    server.matching_jobs = matching_jobs
+
+    # Random draws are shared across handler threads, so guard the generator with a lock
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    def rng_gauss(mean, deviation):
+        with rng_lock:
+            return rng.gauss(mean, deviation)
+
+    def rng_random():
+        with rng_lock:
+            return rng.random()
+
+    server.rng_gauss = rng_gauss
+    server.rng_random = rng_random
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1/api/jobs"
+    return server, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Adzuna job search API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--total-results", type=int, default=5000)
+    parser.add_argument("--max-page-depth", type=int, help="Deepest page served for one search")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(
+        args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+        args.throttle_rate, total_results=args.total_results, max_page_depth=args.max_page_depth
+    )
+    print(f"Mock Adzuna API serving at {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from common import metrics
+
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Database connection parameters from .env
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+}
+DB_NAME = os.getenv("DB_NAME")  # Retrieve the database name
+
+# Size of the process-wide connection pool
+POOL_MIN_CONNECTIONS = 1
+POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", 5))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_db_url():
+    """
+    Load database credentials from environment variables and return the database URL.
+    """
+    user = os.getenv("DB_USER")
+    password = os.getenv("DB_PASSWORD")
+    host = os.getenv("DB_HOST")
+    port = os.getenv("DB_PORT")
+    database = os.getenv("DB_NAME")
+
+    if not all([user, password, host, port, database]):
+        raise ValueError("Error: One or more database environment variables are missing.")
+
+    return f"postgresql://{user}:{password}@{host}:{port}/{database}"
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    """Cursor that counts each statement sent to the server as a database round trip."""
+
+    def execute(self, query, vars=None):
+        metrics.increment("db_round_trips_total")
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        metrics.increment("db_round_trips_total")
+        return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        metrics.increment("db_round_trips_total")
+        return super().copy_expert(sql, file, size)
+
+    def fetchmany(self, size=None):
+        # Named cursors fetch each batch from the server with a separate FETCH
+        if self.name:
+            metrics.increment("db_round_trips_total")
+        return super().fetchmany(size) if size is not None else super().fetchmany()
+
+
+def get_pool():
+    """Return the process-wide psycopg2 connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(
+                POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS,
+                dbname=DB_NAME, cursor_factory=CountingCursor, **DB_CONFIG
+            )
+    return _pool
+
+
+def _is_alive(conn):
+    # Cheap round trip to detect connections dropped by the server while idle in the pool
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1;")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+@contextmanager
+def get_connection():
+    """
+    Check out a pooled connection for the duration of a `with` block.
+
+    The transaction is committed when the block exits normally and rolled back if it raises.
+    The connection is then returned to the pool, or discarded if it has been closed.
+
+    Example:
+    --------
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(...)
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+
+    # Replace a connection that went stale in the pool, like SQLAlchemy's pool_pre_ping
+    if conn.closed or not _is_alive(conn):
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
+
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        # BaseException so a streaming generator closed early also rolls back
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+@lru_cache(maxsize=None)
+def get_engine(db_url=None):
+    """
+    Return a SQLAlchemy engine, created once per database URL and reused.
+
+    The engine keeps its own connection pool and checks connections before use.
+    """
+    return create_engine(db_url or get_db_url(), pool_pre_ping=True)
+
+
+def close_pool():
+    """Close every connection held by the pool, registered to run at interpreter exit."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+atexit.register(close_pool)
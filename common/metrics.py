@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Prometheus text-format file written at the end of each pipeline run
+METRICS_PATH = os.getenv("PIPELINE_METRICS_PATH", "pipeline_metrics.prom")
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Structured log lines are written as one JSON object per line
+logger = logging.getLogger("pipeline.metrics")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _label_key(labels):
+    # Labels are stored as a sorted tuple so they can key a dictionary
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def log_event(event, **fields):
+    """Write a structured JSON log line for a pipeline event."""
+    logger.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str))
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of pipeline counters, gauges and histograms.
+
+    Metrics are identified by name plus optional labels, e.g.
+    `increment("rows_fetched_total", 50)` or `observe("api_request_duration_seconds", 0.2, endpoint="search")`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def increment(self, name, value=1, **labels):
+        """Add `value` to a counter."""
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """Set a gauge to `value`."""
+        with self.lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        """Record one observation in a histogram."""
+        key = (name, _label_key(labels))
+        with self.lock:
+            histogram = self.histograms.setdefault(
+                key, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+            )
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a pipeline stage, recording its duration and logging when it finishes.
+
+        Example:
+        --------
+            with metrics.stage("extract"):
+                ...
+        """
+        log_event("stage_started", stage=name)
+        start = time.perf_counter()
+        status = "success"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.set_gauge("pipeline_stage_duration_seconds", duration, stage=name)
+            self.increment("pipeline_stage_runs_total", stage=name, status=status)
+            log_event("stage_finished", stage=name, status=status, duration_seconds=round(duration, 4))
+
+    def snapshot(self):
+        """Return every metric as a JSON-serialisable dictionary."""
+        with self.lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.counters.items()],
+                "gauges": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.gauges.items()],
+                "histograms": [
+                    {"name": name, "labels": dict(labels), "count": histogram["count"], "sum": histogram["sum"]}
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def to_prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for metric_type, metrics in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in metrics}):
+                    lines.append(f"# TYPE {name} {metric_type}")
+                    for (metric_name, labels), value in sorted(metrics.items()):
+                        if metric_name == name:
+                            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric_name, labels), histogram in sorted(self.histograms.items()):
+                    if metric_name != name:
+                        continue
+                    for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                        lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=METRICS_PATH):
+        """Write the metrics to a Prometheus text-format file, e.g. for the node exporter textfile collector."""
+        # Write then rename so a scraper never reads a half-written file
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as file:
+            file.write(self.to_prometheus())
+        os.replace(temporary_path, path)
+
+    def flush(self, path=METRICS_PATH):
+        """Log a JSON summary of every metric and write the Prometheus file."""
+        log_event("metrics_summary", **self.snapshot())
+        self.write_prometheus(path)
+
+
+# Process-wide registry shared by the extraction and analysis packages
+registry = MetricsRegistry()
+
+increment = registry.increment
+set_gauge = registry.set_gauge
+observe = registry.observe
+stage = registry.stage
+flush = registry.flush
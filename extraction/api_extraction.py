@@ -1,82 +1,326 @@
 import psycopg2
+from psycopg2.extras import execute_values
 import requests
-from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import io
 import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
 
+from common import metrics
+from common.db import get_connection
+from extraction.failed_pages import FailedPageLog, load_failed_runs
+from extraction.rate_limiter import AdaptiveTokenBucket
 
 
-# Load environment variables from .env file
-load_dotenv()
 
-# Database connection parameters from .env
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "port": os.getenv("DB_PORT"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-}
-DB_NAME = os.getenv("DB_NAME")  # Retrieve the database name
-
-# Adzuna API keys from .env
+# Adzuna API keys from .env (loaded when common.db is imported)
 app_id = os.getenv("ADZUNA_APP_ID")
 api_key = os.getenv("ADZUNA_API_KEY")
 
+# Base URL of the Adzuna jobs API, can point at a local stand-in for benchmarking
+ADZUNA_BASE_URL = os.getenv("ADZUNA_BASE_URL", "https://api.adzuna.com/v1/api/jobs")
+
 # Defining name for database table where job listings will be stored
 TABLE_NAME = 'student.data_engineer_jobs'
 
+# Table recording which country and search query each listing was found under
+SOURCES_TABLE_NAME = 'student.data_engineer_job_sources'
+
+# Default search, listings per page is the most the API returns
+DEFAULT_COUNTRY = 'gb'
+DEFAULT_QUERY = 'Data Engineer'
+RESULTS_PER_PAGE = 50
+
+# Currency Adzuna reports salaries in for each country, stored with every listing
+COUNTRY_CURRENCIES = {
+    'at': 'EUR', 'au': 'AUD', 'be': 'EUR', 'br': 'BRL', 'ca': 'CAD', 'ch': 'CHF', 'de': 'EUR',
+    'es': 'EUR', 'fr': 'EUR', 'gb': 'GBP', 'ie': 'EUR', 'in': 'INR', 'it': 'EUR', 'mx': 'MXN',
+    'nl': 'EUR', 'nz': 'NZD', 'pl': 'PLN', 'sg': 'SGD', 'us': 'USD', 'za': 'ZAR',
+}
+
+# Staging table used for bulk loading, and settings for the bulk insert
+STAGING_TABLE_NAME = 'student.data_engineer_jobs_staging'
+INSERT_BATCH_SIZE = 1000
+COPY_NULL = '\\N'  # Marker written to the COPY buffer for NULL values
+
+# Concurrency settings for fetching multiple pages, tuned to stay within the API quota
+MAX_CONCURRENT_REQUESTS = int(os.getenv("ADZUNA_MAX_CONCURRENCY", 5))
+REQUESTS_PER_SECOND = float(os.getenv("ADZUNA_REQUESTS_PER_SECOND", 2))
+MAX_REQUESTS_PER_SECOND = float(os.getenv("ADZUNA_MAX_REQUESTS_PER_SECOND", REQUESTS_PER_SECOND * 2))
 
-def fetch_adzuna_jobs(page_number, max_days_old=None):
+# Retry settings for transient failures, waits grow exponentially with full jitter
+MAX_RETRIES = int(os.getenv("ADZUNA_MAX_RETRIES", 5))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT_SECONDS = 30
+
+# Shared session so connections to the API are pooled and reused between requests
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS))
+session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS))
+
+
+def parse_retry_after(value):
     """
-    Makes API request to Adzuna with chosen parameters and returns response, handling errors that may occur
+    Return the wait in seconds asked for by a Retry-After header, or None if absent or invalid.
+
+    The header holds either a number of seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Return how long to wait before retry number `attempt` (starting at 0).
+
+    Uses exponential backoff with full jitter, so concurrent workers retrying together
+    spread out instead of hitting the API at the same moment. A Retry-After wait from the
+    server is always respected.
+    """
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def request_adzuna(url, params, rate_limiter=None, max_retries=MAX_RETRIES, label="Request"):
+    """
+    Makes a GET request to the Adzuna API and returns the parsed JSON body, handling errors that may occur
+
+    Transient failures (network errors, timeouts, unparseable responses and HTTP 429 or 5xx)
+    are retried with exponential backoff and jitter, honouring any Retry-After header.
+    Throttled and healthy responses are reported to an adaptive rate limiter so the request
+    rate follows what the API will accept.
 
     Parameters:
     -----------
-    page_number : int
-        Integer number specifying the Azduna listing page to return
-    
+    url : str
+        Endpoint to request
+
+    params : dict
+        Query string parameters, including the API credentials
+
+    rate_limiter=None : AdaptiveTokenBucket
+        Optional limiter every attempt takes a token from, including retries
+
+    max_retries=MAX_RETRIES : int
+        Number of retries after the first attempt before the request is given up on
+
+    label="Request" : str
+        Prefix for log messages, e.g. "Page 3"
+
+    Returns:
+    --------
+    dict
+        The response body, or None if every attempt failed
+    """
+    for attempt in range(max_retries + 1):
+        retry_after = None
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+
+        # Try block to error handle API request
+        try:
+            start_time = time.perf_counter()
+            response = session.get(url, params=params, timeout=REQUEST_TIMEOUT_SECONDS)
+            metrics.observe("api_request_duration_seconds", time.perf_counter() - start_time)
+            metrics.increment("api_requests_total", status=response.status_code)
+
+            if response.status_code in RETRY_STATUS_CODES:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if response.status_code == 429 and rate_limiter is not None:
+                    rate_limiter.on_throttle(retry_after)
+                metrics.increment("api_request_errors_total", kind="throttled" if response.status_code == 429 else "server")
+                print(f"{label}: HTTP {response.status_code} (attempt {attempt + 1}/{max_retries + 1}).")
+            else:
+                response.raise_for_status()  # Raise an error for other non-200 responses, these are not retried
+
+                # If status code is 200, return the parsed body
+                body = response.json()
+                if rate_limiter is not None:
+                    rate_limiter.on_success()
+                return body
+
+        except requests.exceptions.HTTPError as e:
+            # Client errors such as a bad API key will fail the same way again
+            metrics.increment("api_request_errors_total", kind="client")
+            print(f"{label}: request rejected: {e}")
+            return None
+
+        except requests.exceptions.JSONDecodeError:
+            # Catches errors with incorrect response, e.g. HTML instead of JSON,
+            # before RequestException as requests' JSONDecodeError subclasses it
+            metrics.increment("api_request_errors_total", kind="parse")
+            print(f"{label}: unable to parse response from API.")
+
+        except requests.exceptions.RequestException as e:
+            # Exception class from results library to catch network-related errors 
+            metrics.increment("api_request_errors_total", kind="network")
+            print(f"{label}: network error: {e}")
+
+        except Exception as e:
+            # Catches any other unexpected errors, which are not retried
+            metrics.increment("api_request_errors_total", kind="unexpected")
+            print(f"{label}: an unexpected error occurred: {e}")
+            return None
+
+        if attempt < max_retries:
+            metrics.increment("api_request_retries_total")
+            time.sleep(backoff_delay(attempt, retry_after))
+
+    print(f"{label}: giving up after {max_retries + 1} attempts.")
+    return None  # Return None in case of failure
+
+
+def search_params(what=DEFAULT_QUERY, max_days_old=None, filters=None):
+    """
+    Builds the query string for a search, with the API credentials.
+
+    Parameters:
+    -----------
+    what=DEFAULT_QUERY : str
+        Search term
+
     max_days_old=None : int
         Optional parameter to return the most recent jobs by age in days
 
+    filters=None : dict
+        Optional extra Adzuna search parameters, e.g. {'salary_min': 50000, 'location0': 'UK'}
+
     Returns:
     --------
-    list
-        A list of dictionaries with each item representing a job listing
-
+    dict
+        Parameters for `request_adzuna`
     """
-    
-    url = f'https://api.adzuna.com/v1/api/jobs/gb/search/{page_number}'
     params = {
         'app_id': app_id,  # Your app ID
         'app_key': api_key,  # Your API key
-        'results_per_page': '50',  # Number of results to be displayed
-        'what': 'Data Engineer',  # Search term
+        'results_per_page': str(RESULTS_PER_PAGE),  # Number of results to be displayed
+        'what': what,  # Search term
     }
     if max_days_old:
         params['max_days_old'] = max_days_old
+    if filters:
+        params.update(filters)
+    return params
 
-        # Try block to error handle API request
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()  # Raise an error for non-200 response
 
-        # If status code is 200, return the results
-        return response.json().get('results', [])
-    
-    except requests.exceptions.RequestException as e:
-        # Exception class from results library to catch network-related errors 
-        print(f"Network error: {e}")
-    
-    except ValueError:
-        # Catches errors with incorrect response, e.g. HTML instead of JSON
-        print("Error: Unable to parse response from API.")
+def fetch_adzuna_page(page_number, max_days_old=None, rate_limiter=None, max_retries=MAX_RETRIES,
+                      country=DEFAULT_COUNTRY, what=DEFAULT_QUERY, filters=None):
+    """
+    Requests one page of search results and returns the whole response.
+
+    Takes the same parameters as `fetch_adzuna_jobs`.
+
+    Returns:
+    --------
+    dict
+        Response with the page's 'results' and the 'count' of every listing matching the search,
+        or None if every attempt failed
+    """
+    url = f'{ADZUNA_BASE_URL}/{country}/search/{page_number}'
+    return request_adzuna(
+        url, search_params(what, max_days_old, filters), rate_limiter, max_retries, label=f"Page {page_number}"
+    )
+
+
+def fetch_adzuna_jobs(page_number, max_days_old=None, rate_limiter=None, max_retries=MAX_RETRIES,
+                      country=DEFAULT_COUNTRY, what=DEFAULT_QUERY, filters=None):
+    """
+    Makes API request to Adzuna with chosen parameters and returns response, handling errors that may occur
+
+    Failed requests are retried as described in `request_adzuna`.
+
+    Parameters:
+    -----------
+    page_number : int
+        Integer number specifying the Azduna listing page to return
     
-    except Exception as e:
-        # Catches any other unexpected errors
-        print(f"An unexpected error occurred: {e}")
+    max_days_old=None : int
+        Optional parameter to return the most recent jobs by age in days
 
-    return None  # Return None in case of failure
+    rate_limiter=None : AdaptiveTokenBucket
+        Optional limiter every attempt takes a token from, including retries
+
+    max_retries=MAX_RETRIES : int
+        Number of retries after the first attempt before the page is given up on
+
+    country=DEFAULT_COUNTRY : str
+        Two letter Adzuna country code, e.g. 'gb' or 'de'
+
+    what=DEFAULT_QUERY : str
+        Search term
+
+    filters=None : dict
+        Optional extra Adzuna search parameters, e.g. salary or location filters
+
+    Returns:
+    --------
+    list
+        A list of dictionaries with each item representing a job listing, or None if every attempt failed
+
+    """
+    response = fetch_adzuna_page(page_number, max_days_old, rate_limiter, max_retries, country, what, filters)
+    if response is None:
+        return None
+
+    results = response.get('results', [])
+    metrics.increment("rows_fetched_total", len(results))
+    return results
+
+
+def fetch_adzuna_geodata(country=DEFAULT_COUNTRY, what=DEFAULT_QUERY, max_days_old=None, filters=None, rate_limiter=None):
+    """
+    Requests how the listings matching a search are spread over the sub-locations of a location.
+
+    Parameters:
+    -----------
+    country=DEFAULT_COUNTRY / what=DEFAULT_QUERY : str
+        Adzuna country code and search term
+
+    max_days_old=None : int
+        Optional parameter to return the most recent jobs by age in days
+
+    filters=None : dict
+        Search filters, the location0, location1, ... levels give the location to break down
+
+    rate_limiter=None : AdaptiveTokenBucket
+        Optional limiter shared with other requests
+
+    Returns:
+    --------
+    list of tuple
+        (area, count) for each sub-location, where area is the list of location levels
+        e.g. ['UK', 'London'], or None if the request failed
+    """
+    params = search_params(what, max_days_old, filters)
+    params.pop('results_per_page')
+    response = request_adzuna(f'{ADZUNA_BASE_URL}/{country}/geodata', params, rate_limiter, label="Geodata")
+    if response is None:
+        return None
+    return [
+        (entry['location'].get('area', []), int(entry.get('count', 0)))
+        for entry in response.get('locations', [])
+        if entry.get('location')
+    ]
 
-def clean_job_data(job):
+
+def clean_job_data(job, country=DEFAULT_COUNTRY):
     """
     Cleaning function, takes a single job dictionary and extracts relevant fields to create clean dictionary
 
@@ -85,14 +329,19 @@ def clean_job_data(job):
     job : dict
         A dictionary containing job listing data.
 
+    country=DEFAULT_COUNTRY : str
+        Adzuna country code the listing was fetched from, salaries are in its currency
+
     Returns:
     --------
     dict
         A cleaned dictionary with keys: 'id', 'title', 'description', 'company', 
-        'location', 'salary_min', 'salary_max', 'redirect_url'.
+        'location', 'salary_min', 'salary_max', 'redirect_url',
+        with 'id' as an int so it compares equal to ids loaded from the database,
+        plus 'country' and 'salary_currency'.
     """
     return {
-        'id': job.get('id'),
+        'id': int(job['id']) if job.get('id') is not None else None,  # The API sends ids as strings, the table stores BIGINT
         'title': job.get('title'),
         'description': job.get('description', '').strip(),
         'company': job.get('company_name', '').strip(),
@@ -100,9 +349,12 @@ def clean_job_data(job):
         'salary_min': job.get('salary_min'),
         'salary_max': job.get('salary_max'),
         'redirect_url': job.get('redirect_url', '').strip(),
+        'country': country,
+        'salary_currency': COUNTRY_CURRENCIES.get(country),
     }
 
-def extract_adzuna_data(page_number, max_days_old=None):
+def extract_adzuna_data(page_number, max_days_old=None, rate_limiter=None, country=DEFAULT_COUNTRY, what=DEFAULT_QUERY,
+                        filters=None):
     """
     Returns cleaned list of dictionaries for each job listing.
 
@@ -114,88 +366,394 @@ def extract_adzuna_data(page_number, max_days_old=None):
     max_days_old=None : int
         Optional parameter to return the most recent jobs by age in days
 
+    rate_limiter=None : AdaptiveTokenBucket
+        Optional limiter shared with other requests
+
+    country=DEFAULT_COUNTRY / what=DEFAULT_QUERY : str
+        Adzuna country code and search term
+
+    filters=None : dict
+        Optional extra Adzuna search parameters, e.g. salary or location filters
+
     Returns:
     --------
     list
         A list of dictionaries with each item a clean dictionary for each job listing. 
         Within the clean dictionary, each key represents a data field: 'id', 'location,' description' etc...
+        None if the page could not be fetched, as opposed to an empty list for a page with no listings.
+
+    """
+    job_results = fetch_adzuna_jobs(page_number, max_days_old, rate_limiter, country=country, what=what, filters=filters)
+    if job_results is None:
+        return None
+    return [clean_job_data(job, country) for job in job_results]
+
 
+def deduplicate_jobs(jobs):
     """
-    job_results = fetch_adzuna_jobs(page_number, max_days_old)
-    return [clean_job_data(job) for job in job_results] if job_results else []
+    Removes repeated job listings by 'id', keeping the first occurrence and the original order.
 
+    Parameters:
+    -----------
+    jobs : iterable of dict
+        Clean job dictionaries, as returned by `clean_job_data`
+
+    Returns:
+    --------
+    list
+        A list of job dictionaries with unique 'id' values
+    """
+    seen_ids = set()
+    unique_jobs = []
+    for job in jobs:
+        if job['id'] in seen_ids:
+            continue
+        seen_ids.add(job['id'])
+        unique_jobs.append(job)
+    return unique_jobs
 
+
+def extract_adzuna_pages(page_numbers, max_days_old=None, max_workers=MAX_CONCURRENT_REQUESTS, rate_limiter=None,
+                         failed_pages=None):
+    """
+    Fetches several Adzuna listing pages concurrently and returns their cleaned, deduplicated jobs.
+
+    Pages are fetched by a thread pool sharing the pooled `session`, and every request first
+    takes a token from the rate limiter so the crawl is bounded by the API quota. The limiter
+    adapts its rate to throttling, and pages that still fail after every retry are recorded.
+
+    Parameters:
+    -----------
+    page_numbers : iterable of int
+        Adzuna listing pages to fetch
     
+    max_days_old=None : int
+        Optional parameter to return the most recent jobs by age in days
+
+    max_workers=MAX_CONCURRENT_REQUESTS : int
+        Maximum number of requests in flight at once
+
+    rate_limiter=None : AdaptiveTokenBucket
+        Optional limiter shared with other callers, defaults to a new adaptive bucket starting at
+        REQUESTS_PER_SECOND and ramping up to MAX_REQUESTS_PER_SECOND
+
+    failed_pages=None : FailedPageLog
+        Optional record the pages that could not be fetched are added to
 
-# Connects to pagila database using credentials and creates table
+    Returns:
+    --------
+    list
+        Clean job dictionaries in page order, with duplicate 'id' values removed
+    """
+    if rate_limiter is None:
+        rate_limiter = AdaptiveTokenBucket(REQUESTS_PER_SECOND, max_rate=MAX_REQUESTS_PER_SECOND)
+
+    def fetch_page(page_number):
+        page = extract_adzuna_data(page_number, max_days_old, rate_limiter)
+        if page is None:
+            metrics.increment("api_pages_failed_total")
+            if failed_pages is not None:
+                failed_pages.record(page_number, max_days_old=max_days_old)
+            return []
+        return page
+
+    # executor.map returns results in the order pages were submitted, not completion order
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = list(executor.map(fetch_page, page_numbers))
+
+    metrics.set_gauge("api_request_rate_per_second", rate_limiter.rate)
+    return deduplicate_jobs(job for page in pages for job in page)
+
+
+def retry_failed_pages(max_workers=MAX_CONCURRENT_REQUESTS, rate_limiter=None):
+    """
+    Fetches the pages earlier runs recorded as failed, with the parameters they were requested with,
+    and crawls again any full crawl shards they could not plan.
+
+    Records are not changed here. Each run's returned FailedPageLog holds only the pages that
+    failed again, and saving it rewrites the record, or removes it once every page in it has been
+    recovered. Callers save the logs only after the recovered jobs are stored, so a failed insert
+    leaves the records for the next retry.
+
+    Returns:
+    --------
+    tuple
+        (clean, deduplicated job dictionaries from the recovered pages, list of (job_id, country, query)
+        provenance rows for them, list of FailedPageLog to save once they are stored)
+    """
+    if rate_limiter is None:
+        rate_limiter = AdaptiveTokenBucket(REQUESTS_PER_SECOND, max_rate=MAX_REQUESTS_PER_SECOND)
+
+    recovered = []
+    sources = []
+    retry_logs = []
+    for path, entries in load_failed_runs():
+        still_failed = FailedPageLog(path)
+
+        def fetch_entry(entry):
+            page = extract_adzuna_data(entry['page_number'], rate_limiter=rate_limiter, **entry['params'])
+            if page is None:
+                still_failed.record(entry['page_number'], **entry['params'])
+                return []
+            return page
+
+        page_entries = [entry for entry in entries if 'shard' not in entry]
+        shard_entries = [entry for entry in entries if 'shard' in entry]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages = list(executor.map(fetch_entry, page_entries))
+
+        recovered.extend(job for page in pages for job in page)
+        # Pages keep the search they were requested with, so fan-out listings keep their provenance
+        sources.extend(
+            (int(job['id']), entry['params'].get('country', DEFAULT_COUNTRY), entry['params'].get('what', DEFAULT_QUERY))
+            for entry, page in zip(page_entries, pages) for job in page
+        )
+
+        if shard_entries:
+            # Imported here, the sharding module builds on this one
+            from extraction.sharding import retry_failed_shards
+
+            # Full crawl shards that could not be probed are planned and crawled again
+            shard_jobs, shard_sources = retry_failed_shards(shard_entries, max_workers, rate_limiter, still_failed)
+            recovered.extend(shard_jobs)
+            sources.extend(shard_sources)
+        print(f"Retried {len(page_entries)} failed pages and {len(shard_entries)} failed shards from '{path}', "
+              f"{len(still_failed)} still failing.")
+        retry_logs.append(still_failed)
+
+    return deduplicate_jobs(recovered), list(dict.fromkeys(sources)), retry_logs
+
+
+
+# Connects to database through the shared pool and creates table
 def create_table():
     """Create the jobs table if it does not exist."""
     try:
-        conn = psycopg2.connect(dbname= DB_NAME, **DB_CONFIG)
-        cursor = conn.cursor()
-        
-        # SQL to create the table
-        create_table_query = f"""
-        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-            id BIGINT PRIMARY KEY,
-            title TEXT,
-            description TEXT,
-            company TEXT,
-            location TEXT,
-            salary_min NUMERIC,
-            salary_max NUMERIC,
-            redirect_url TEXT,
-            created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-        cursor.execute(create_table_query)
-        conn.commit()
-        print(f"Table '{TABLE_NAME}' created (or already exists).")
+        with get_connection() as conn, conn.cursor() as cursor:
+            # SQL to create the table
+            create_table_query = f"""
+            CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+                id BIGINT PRIMARY KEY,
+                title TEXT,
+                description TEXT,
+                company TEXT,
+                location TEXT,
+                salary_min NUMERIC,
+                salary_max NUMERIC,
+                redirect_url TEXT,
+                created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                country TEXT NOT NULL DEFAULT 'gb',
+                salary_currency TEXT DEFAULT 'GBP'
+            );
+            """
+            cursor.execute(create_table_query)
+
+            # Tables created before listings came from several countries only hold UK listings
+            cursor.execute(f"""
+            ALTER TABLE {TABLE_NAME}
+            ADD COLUMN IF NOT EXISTS country TEXT NOT NULL DEFAULT 'gb',
+            ADD COLUMN IF NOT EXISTS salary_currency TEXT DEFAULT 'GBP';
+            """)
+
+            # One row per country and search query a listing was found under
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SOURCES_TABLE_NAME} (
+                job_id BIGINT REFERENCES {TABLE_NAME} (id) ON DELETE CASCADE,
+                country TEXT,
+                query TEXT,
+                first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (job_id, country, query)
+            );
+            """)
+        print(f"Tables '{TABLE_NAME}' and '{SOURCES_TABLE_NAME}' created (or already exist).")
     
     except Exception as e:
         print("An error occurred while creating the table:", e)
-    
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+
+# Columns loaded from each clean job dictionary, in table order
+JOB_COLUMNS = [
+    'id', 'title', 'description', 'company', 'location', 'salary_min', 'salary_max', 'redirect_url',
+    'country', 'salary_currency'
+]
+
+
+def _jobs_to_csv_buffer(clean_data):
+    """
+    Writes clean job dictionaries to an in-memory CSV buffer for COPY.
+    None values are written as the unquoted NULL marker so they load as NULL, not empty strings.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for job in clean_data:
+        writer.writerow([COPY_NULL if job.get(column) is None else job.get(column) for column in JOB_COLUMNS])
+    buffer.seek(0)
+    return buffer
+
+
+def _copy_merge_jobs(cursor, clean_data):
+    """
+    Bulk loads jobs with COPY into the unlogged staging table, then merges them into
+    the jobs table with a single INSERT ... SELECT. Returns the number of rows inserted.
+    """
+    columns = ', '.join(JOB_COLUMNS)
+
+    # Unlogged staging table skips the write-ahead log, it only ever holds the current batch
+    cursor.execute(f"""
+    CREATE UNLOGGED TABLE IF NOT EXISTS {STAGING_TABLE_NAME} (
+        id BIGINT,
+        title TEXT,
+        description TEXT,
+        company TEXT,
+        location TEXT,
+        salary_min NUMERIC,
+        salary_max NUMERIC,
+        redirect_url TEXT,
+        country TEXT,
+        salary_currency TEXT
+    );
+    """)
+    cursor.execute(f"""
+    ALTER TABLE {STAGING_TABLE_NAME}
+    ADD COLUMN IF NOT EXISTS country TEXT,
+    ADD COLUMN IF NOT EXISTS salary_currency TEXT;
+    """)
+    # TRUNCATE locks the staging table until commit, so concurrent loads run one after another
+    cursor.execute(f"TRUNCATE {STAGING_TABLE_NAME};")
+
+    cursor.copy_expert(
+        f"COPY {STAGING_TABLE_NAME} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+        _jobs_to_csv_buffer(clean_data)
+    )
+
+    # DISTINCT ON removes repeated ids within the batch before merging
+    cursor.execute(f"""
+    INSERT INTO {TABLE_NAME} ({columns}, created)
+    SELECT DISTINCT ON (id) {columns}, NOW()
+    FROM {STAGING_TABLE_NAME}
+    ORDER BY id
+    ON CONFLICT (id) DO NOTHING;
+    """)
+    return cursor.rowcount
+
+
+def _batch_insert_jobs(cursor, clean_data):
+    """
+    Fallback loader inserting jobs in batches with execute_values.
+    Returns the number of rows inserted.
+    """
+    insert_query = f"""
+    INSERT INTO {TABLE_NAME} ({', '.join(JOB_COLUMNS)}, created)
+    VALUES %s
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id;
+    """
+    rows = [tuple(job.get(column) for column in JOB_COLUMNS) for job in clean_data]
+
+    # RETURNING only yields ids that were actually inserted, fetch=True collects them across batches
+    inserted_ids = execute_values(
+        cursor,
+        insert_query,
+        rows,
+        template=f"({', '.join(['%s'] * len(JOB_COLUMNS))}, NOW())",
+        page_size=INSERT_BATCH_SIZE,
+        fetch=True
+    )
+    return len(inserted_ids)
+
 
 def insert_jobs_to_db(clean_data):
-    """Insert job data into the jobs table."""
+    """
+    Bulk insert job data into the jobs table, skipping jobs whose id is already stored.
+
+    Loads through COPY into a staging table and a single merge query, falling back to
+    batched execute_values inserts if the COPY path fails.
+
+    Parameters:
+    -----------
+    clean_data : list of dict
+        Clean job dictionaries, as returned by `extract_adzuna_data`
+
+    Returns:
+    --------
+    tuple
+        (rows_inserted, rows_skipped), or (0, 0) if the insert failed
+    """
     try:
-        conn = psycopg2.connect(dbname=DB_NAME, **DB_CONFIG)
-        cursor = conn.cursor()
-        
-        # SQL query to insert job data
-        insert_query = f"""
-        INSERT INTO {TABLE_NAME} (id, title, description, company, location, 
-                                salary_min, salary_max, redirect_url, created)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW()) 
-        ON CONFLICT (id) DO NOTHING;
-        """
-        
-        # Insert each job into the database
-        for job in clean_data:
-            cursor.execute(insert_query, (
-                job["id"],
-                job["title"],
-                job["description"],
-                job["company"],
-                job["location"],  
-                job.get("salary_min", None),
-                job.get("salary_max", None),
-                job["redirect_url"]  
-            ))
-        
-        conn.commit()
-        print("Job data inserted successfully.")
-    
+        # Transaction is committed when the block exits, rolled back on error
+        with get_connection() as conn, conn.cursor() as cursor:
+            try:
+                inserted = _copy_merge_jobs(cursor, clean_data)
+            except psycopg2.Error as e:
+                # e.g. missing permission to create the staging table, retry with plain inserts
+                print("Bulk COPY failed, falling back to batched inserts:", e)
+                conn.rollback()
+                inserted = _batch_insert_jobs(cursor, clean_data)
+
+        skipped = len(clean_data) - inserted
+        metrics.increment("rows_inserted_total", inserted)
+        metrics.increment("rows_skipped_total", skipped)
+        print(f"Job data inserted successfully: {inserted} inserted, {skipped} skipped.")
+        return inserted, skipped
+
     except Exception as e:
         print("An error occurred while inserting data:", e)
-    
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+
+    return 0, 0
+
+
+def insert_job_sources(sources):
+    """
+    Records the country and search query each listing was found under.
+
+    Parameters:
+    -----------
+    sources : list of tuple
+        (job_id, country, query) rows, pairs already recorded are skipped
+
+    Returns:
+    --------
+    int
+        Number of new rows, or 0 if the insert failed
+    """
+    try:
+        with get_connection() as conn, conn.cursor() as cursor:
+            inserted_rows = execute_values(
+                cursor,
+                f"""
+                INSERT INTO {SOURCES_TABLE_NAME} (job_id, country, query) VALUES %s
+                ON CONFLICT (job_id, country, query) DO NOTHING
+                RETURNING job_id;
+                """,
+                sources,
+                page_size=INSERT_BATCH_SIZE,
+                fetch=True
+            )
+        metrics.increment("job_sources_inserted_total", len(inserted_rows))
+        print(f"Job sources recorded: {len(inserted_rows)} new.")
+        return len(inserted_rows)
+
+    except Exception as e:
+        print("An error occurred while inserting job sources:", e)
+
+    return 0
+
+
+def load_known_job_ids():
+    """
+    Load the ids of every job already stored in the jobs table.
+
+    Returns:
+    --------
+    set
+        Set of stored job ids, or None if the table could not be read
+    """
+    try:
+        with get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM {TABLE_NAME};")
+            return {row[0] for row in cursor.fetchall()}
+
+    except Exception as e:
+        print("An error occurred while loading known job ids:", e)
+
+    return None
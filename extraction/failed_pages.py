@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+
+# Directory holding one record per run of the pages it could not fetch, so they can be retried
+FAILED_PAGES_DIRECTORY = os.getenv("ADZUNA_FAILED_PAGES_DIRECTORY", "extraction/failed_pages")
+
+
+class FailedPageLog:
+    """
+    Thread-safe record of the listing pages a run failed to fetch after every retry.
+
+    Each entry keeps the page number and search parameters needed to request the page again,
+    or for a full crawl shard that could not be planned, the shard to plan again.
+
+    Parameters:
+    -----------
+    path=None : str
+        File the record is saved to, defaults to a new file named after the run's start time
+    """
+
+    def __init__(self, path=None):
+        self.run_started_at = datetime.now(timezone.utc)
+        self.path = path or os.path.join(
+            FAILED_PAGES_DIRECTORY, f"{self.run_started_at.strftime('%Y%m%dT%H%M%S%fZ')}.json"
+        )
+        self.pages = []
+        self.lock = threading.Lock()
+
+    def record(self, page_number, **search_params):
+        """Add a failed page, with the parameters it was requested with."""
+        with self.lock:
+            self.pages.append({
+                "page_number": page_number,
+                "params": search_params,
+                "failed_at": datetime.now(timezone.utc).isoformat(),
+            })
+
+    def record_shard(self, **search_params):
+        """Add a search shard whose listing count could not be fetched, so a retry plans it again."""
+        with self.lock:
+            self.pages.append({
+                "shard": search_params,
+                "failed_at": datetime.now(timezone.utc).isoformat(),
+            })
+
+    def __len__(self):
+        return len(self.pages)
+
+    def save(self):
+        """
+        Write the failed pages to this run's record file.
+
+        A run with no failures leaves no file, and removes its file if one was written before.
+        """
+        with self.lock:
+            pages = list(self.pages)
+
+        if not pages:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as file:
+            json.dump({"run_started_at": self.run_started_at.isoformat(), "pages": pages}, file, indent=2)
+        print(f"{len(pages)} pages could not be fetched, recorded in '{self.path}'.")
+
+
+def load_failed_runs(directory=FAILED_PAGES_DIRECTORY):
+    """
+    Return the failed page records of every earlier run, oldest first.
+
+    Returns:
+    --------
+    list of tuple
+        (record file path, list of failed page entries) for each run with failures
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    runs = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path, "r") as file:
+                runs.append((path, json.load(file).get("pages", [])))
+        except ValueError:
+            print(f"Skipping unreadable failed page record '{path}'.")
+    return runs
@@ -0,0 +1,120 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to keep API requests within the Adzuna quota.
+
+    Tokens are added continuously at `rate` per second up to `capacity`. Each request
+    takes one token, and callers block until a token is available.
+
+    Parameters:
+    -----------
+    rate : float
+        Number of tokens (requests) added to the bucket per second
+
+    capacity=None : int
+        Maximum number of tokens the bucket can hold, i.e. the largest allowed burst.
+        Defaults to `rate` rounded up to at least 1
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("Error: Token bucket rate must be greater than zero.")
+
+        self.rate = rate
+        self.capacity = capacity if capacity else max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        # Add tokens for the time elapsed since the last refill, capped at capacity
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` tokens are available, then take them."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                # Time until enough tokens will have been added
+                wait_time = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait_time)
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    Token bucket whose rate adapts to how the API responds (additive increase, multiplicative decrease).
+
+    Every healthy response raises the rate a little, by about `increase` requests per second
+    each second, up to `max_rate`. A throttled response cuts the rate by `decrease_factor`,
+    down to `min_rate`, and pauses every caller for the server's Retry-After delay. A burst of
+    throttled responses to requests already in flight only cuts the rate once.
+
+    Parameters:
+    -----------
+    rate : float
+        Starting number of requests per second
+
+    min_rate=None / max_rate=None : float
+        Bounds on the adapted rate, default to a tenth of and twice the starting rate
+
+    increase=0.1 : float
+        Requests per second added for every second of healthy responses
+
+    decrease_factor=0.5 : float
+        Fraction of the rate kept after a throttled response
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=None, max_rate=None, increase=0.1, decrease_factor=0.5):
+        super().__init__(rate, capacity)
+        self.min_rate = min_rate if min_rate else rate / 10
+        self.max_rate = max_rate if max_rate else rate * 2
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+
+    def acquire(self, tokens=1):
+        """Wait out any Retry-After pause, then block until `tokens` tokens are available."""
+        while True:
+            with self.lock:
+                wait_time = self.paused_until - time.monotonic()
+            if wait_time <= 0:
+                break
+            time.sleep(wait_time)
+        super().acquire(tokens)
+
+    def on_success(self):
+        """Record a healthy response, ramping the rate up."""
+        with self.lock:
+            self._refill()
+            # Spread over the current rate so the increase is per second, not per request
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self, retry_after=None):
+        """
+        Record a throttled response, backing the rate off.
+
+        Parameters:
+        -----------
+        retry_after=None : float
+            Seconds the server asked clients to wait, every caller is paused for this long
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill()
+            # Requests sent before the last cut were made at the old rate, so do not cut again for them
+            if now - self.last_decrease >= max(1.0, 1 / self.rate):
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self.last_decrease = now
+            self.tokens = 0.0
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
@@ -1,34 +1,76 @@
-from extraction.api_extraction import create_table, extract_adzuna_data, insert_jobs_to_db
+import argparse
 
+from common import metrics
+from extraction.api_extraction import (
+    DEFAULT_COUNTRY, DEFAULT_QUERY, create_table, extract_adzuna_pages, insert_job_sources, insert_jobs_to_db,
+    retry_failed_pages
+)
+from extraction.failed_pages import FailedPageLog
+from extraction.scheduler import SearchJob
+from extraction.sharding import crawl_query_space
 
-def main():
+# Number of listing pages to fetch, each page holds 50 listings
+NUMBER_OF_PAGES = 10
+
+
+def main(retry_failed=False, full_crawl=False):
     """
     Main function to execute the full pipeline of fetching, processing, and inserting job data into the database.
     
     Steps:
     1. Creates a database table if it doesn't already exist.
-    2. Fetches job data from the Adzuna API across multiple pages.
+    2. Fetches job data from the Adzuna API across multiple pages concurrently, or with
+       `retry_failed` only the pages earlier runs failed to fetch. With `full_crawl` every
+       listing is fetched, by splitting the search into shards that fit the page depth limit.
     3. Inserts the fetched data into database if data is available; otherwise, prints a message indicating no data.
     """
 
-    # Create the table in the database if it doesn't exist  
-    create_table()
+    try:
+        # Create the table in the database if it doesn't exist  
+        with metrics.stage("create_table"):
+            create_table()
+
+        # Fetch data from the first pages concurrently, results come back in page order without duplicates
+        sources, retry_logs = [], []
+        with metrics.stage("extract"):
+            if retry_failed:
+                data, sources, retry_logs = retry_failed_pages()
+            elif full_crawl:
+                failed_pages = FailedPageLog()
+                data, sources = crawl_query_space([SearchJob(DEFAULT_COUNTRY, DEFAULT_QUERY)], failed_pages=failed_pages)
+                failed_pages.save()
+            else:
+                failed_pages = FailedPageLog()
+                data = extract_adzuna_pages(range(1, NUMBER_OF_PAGES + 1), failed_pages=failed_pages)
+                # Pages still failing after every retry are kept for `--retry-failed`
+                failed_pages.save()
 
-    # Initialize an empty list to hold the job data
-    data = []
+        # If there is any data fetched, insert it into the database
+        if data:
+            with metrics.stage("load"):
+                inserted, skipped = insert_jobs_to_db(data)
+            if inserted + skipped != len(data):
+                # Insert failed, keep the failed page records so the pages can be retried again
+                return
+            # Sources reference the jobs table, so they are only recorded once the jobs are stored
+            if sources:
+                insert_job_sources(sources)
+        else:
+            # If no data is fetched, print a message
+            print("No data to insert.")
 
-    # Fetch data from first 10 pages
-    for i in range(1, 11):
-        # Fetch data for the current page and extend the list with new job data for each iteration
-        data.extend(extract_adzuna_data(i))  
+        # Recovered pages are stored, so their records only need the pages that failed again
+        for retry_log in retry_logs:
+            retry_log.save()
 
-    # If there is any data fetched, insert it into the database
-    if data:
-        insert_jobs_to_db(data)
-    else:
-        # If no data is fetched, print a message
-        print("No data to insert.")
+    finally:
+        # Emit stage timings and counters for this run
+        metrics.flush()
 
 # This block ensures the main function is only executed when this script is run directly, not when imported.
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Fetch Adzuna listings and load them into the database.")
+    parser.add_argument("--retry-failed", action="store_true", help="Only fetch the pages earlier runs failed to fetch")
+    parser.add_argument("--full-crawl", action="store_true", help="Fetch every listing, not only the first pages")
+    args = parser.parse_args()
+    main(retry_failed=args.retry_failed, full_crawl=args.full_crawl)
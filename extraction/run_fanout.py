@@ -0,0 +1,61 @@
+import argparse
+
+from common import metrics
+from extraction.api_extraction import create_table, insert_job_sources, insert_jobs_to_db
+from extraction.failed_pages import FailedPageLog
+from extraction.scheduler import ADZUNA_COUNTRIES, MAX_PAGES_PER_SEARCH, ROLE_QUERIES, build_search_jobs, extract_search_jobs
+from extraction.sharding import crawl_query_space
+
+
+def main(countries=ADZUNA_COUNTRIES, queries=ROLE_QUERIES, max_pages=MAX_PAGES_PER_SEARCH, max_days_old=None,
+         full_crawl=False):
+    """
+    Runs every role search in every country and loads the results.
+
+    Steps:
+    1. Creates the jobs and job sources tables if they don't already exist.
+    2. Fetches every (country, query) search concurrently, sharing one API rate budget.
+       With `full_crawl` each search is split into shards so every listing is fetched,
+       instead of at most `max_pages` pages.
+    3. Inserts each listing once, then records every country and query it was found under.
+    """
+    try:
+        with metrics.stage("create_table"):
+            create_table()
+
+        failed_pages = FailedPageLog()
+        with metrics.stage("extract"):
+            if full_crawl:
+                data, sources = crawl_query_space(
+                    build_search_jobs(countries, queries), max_days_old, failed_pages=failed_pages
+                )
+            else:
+                data, sources = extract_search_jobs(
+                    build_search_jobs(countries, queries), max_pages, max_days_old, failed_pages=failed_pages
+                )
+        # Pages still failing after every retry are kept for `run_extraction.py --retry-failed`
+        failed_pages.save()
+
+        if data:
+            with metrics.stage("load"):
+                inserted, skipped = insert_jobs_to_db(data)
+                # Sources reference the jobs table, so they are only recorded once the jobs are stored
+                if inserted + skipped == len(data):
+                    insert_job_sources(sources)
+        else:
+            print("No data to insert.")
+
+    finally:
+        # Emit stage timings and counters for this run
+        metrics.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fetch listings for several role searches across several countries.")
+    parser.add_argument("--countries", nargs="+", default=ADZUNA_COUNTRIES, help="Adzuna country codes, e.g. gb ie de")
+    parser.add_argument("--queries", nargs="+", default=ROLE_QUERIES, help="Search terms, quote multi-word terms")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES_PER_SEARCH, help="Most pages fetched per search")
+    parser.add_argument("--max-days-old", type=int, help="Only fetch listings at most this many days old")
+    parser.add_argument("--full-crawl", action="store_true", help="Fetch every listing, ignoring --max-pages")
+    args = parser.parse_args()
+    main(args.countries, args.queries, args.max_pages, args.max_days_old, args.full_crawl)
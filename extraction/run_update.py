@@ -1,14 +1,160 @@
-from extraction.api_extraction import extract_adzuna_data, insert_jobs_to_db
+import json
+import math
+import os
+from datetime import datetime, timezone
 
-# Program checks for new listing every hour from first page and inserts them to database if new
-def main():
-    data = extract_adzuna_data(1, max_days_old=1)
+from common import metrics
+from extraction.api_extraction import (
+    MAX_REQUESTS_PER_SECOND, REQUESTS_PER_SECOND, extract_adzuna_data, insert_jobs_to_db, load_known_job_ids
+)
+from extraction.failed_pages import FailedPageLog
+from extraction.rate_limiter import AdaptiveTokenBucket
+
+# File recording when the last successful update ran, so the next run knows how far back to crawl
+WATERMARK_PATH = os.getenv("ADZUNA_WATERMARK_PATH", "extraction/update_watermark.json")
+
+# Upper limits on how far back and how deep a single update crawls
+MAX_DAYS_OLD = 30
+MAX_UPDATE_PAGES = 100
+
+# Newest listings first, so the crawl can stop at the first page of already-stored listings
+NEWEST_FIRST = {'sort_by': 'date'}
+
+# Consecutive pages failing after every retry usually means the API is down, so the crawl stops
+MAX_CONSECUTIVE_FAILED_PAGES = 3
+
+
+def load_watermark(path=WATERMARK_PATH):
+    """Return the time of the last successful update as a datetime, or None if there is none."""
+    try:
+        with open(path, "r") as file:
+            return datetime.fromisoformat(json.load(file)["last_run_at"])
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+
+
+def save_watermark(run_started_at, path=WATERMARK_PATH):
+    """Persist the start time of a successful update as the new watermark."""
+    with open(path, "w") as file:
+        json.dump({"last_run_at": run_started_at.isoformat()}, file)
+
+
+def days_since(watermark, now):
+    """
+    Return the max_days_old window covering everything listed since the watermark.
+    Defaults to 1 day without a watermark, and is capped at MAX_DAYS_OLD.
+    """
+    if watermark is None:
+        return 1
+    elapsed_days = (now - watermark).total_seconds() / (24 * 60 * 60)
+    return min(MAX_DAYS_OLD, max(1, math.ceil(elapsed_days)))
+
+
+def crawl_new_jobs(known_ids, max_days_old, max_pages=MAX_UPDATE_PAGES, failed_pages=None, rate_limiter=None):
+    """
+    Pages through recent listings, newest first, until a page contains only already-known ids.
+
+    A page that cannot be fetched after every retry is recorded and skipped, so one failure
+    does not end the crawl early.
+
+    Parameters:
+    -----------
+    known_ids : set
+        Ids already stored in the database, new ids are added to it as they are found
+
+    max_days_old : int
+        Only listings at most this many days old are crawled
+
+    max_pages=MAX_UPDATE_PAGES : int
+        Safety limit on the number of pages fetched
+
+    failed_pages=None : FailedPageLog
+        Optional record the pages that could not be fetched are added to
+
+    rate_limiter=None : AdaptiveTokenBucket
+        Limiter every request takes a token from, defaults to a new adaptive bucket starting at
+        REQUESTS_PER_SECOND, so throttled responses slow the crawl down
+
+    Returns:
+    --------
+    list
+        Clean job dictionaries for listings not yet stored
+    """
+    if rate_limiter is None:
+        rate_limiter = AdaptiveTokenBucket(REQUESTS_PER_SECOND, max_rate=MAX_REQUESTS_PER_SECOND)
+
+    new_jobs = []
+    consecutive_failures = 0
+    for page_number in range(1, max_pages + 1):
+        page = extract_adzuna_data(page_number, max_days_old=max_days_old, rate_limiter=rate_limiter, filters=NEWEST_FIRST)
+
+        if page is None:
+            metrics.increment("api_pages_failed_total")
+            if failed_pages is not None:
+                failed_pages.record(page_number, max_days_old=max_days_old, filters=NEWEST_FIRST)
+            consecutive_failures += 1
+            if consecutive_failures >= MAX_CONSECUTIVE_FAILED_PAGES:
+                print(f"{consecutive_failures} pages in a row could not be fetched, stopping the crawl.")
+                break
+            continue
+        consecutive_failures = 0
+
+        # An empty page means there are no more listings in the window
+        if not page:
+            break
+
+        new_on_page = [job for job in page if job['id'] not in known_ids]
+
+        # Results are sorted by date, so a page of only known listings means everything older has already been stored
+        if not new_on_page:
+            break
+
+        known_ids.update(job['id'] for job in new_on_page)
+        new_jobs.extend(new_on_page)
+
+    print(f"Crawled {page_number} pages, found {len(new_jobs)} new listings.")
+    return new_jobs
+
+
+def run_update():
+    """Crawl listings added since the last watermark and insert the new ones."""
+    run_started_at = datetime.now(timezone.utc)
+
+    with metrics.stage("load_known_ids"):
+        known_ids = load_known_job_ids()
+    if known_ids is None:
+        print("Could not load stored job ids, update skipped.")
+        return
+
+    max_days_old = days_since(load_watermark(), run_started_at)
+    failed_pages = FailedPageLog()
+    with metrics.stage("extract"):
+        data = crawl_new_jobs(known_ids, max_days_old, failed_pages=failed_pages)
+    failed_pages.save()
 
     # Insert the extracted data into the database
     if data:
-        insert_jobs_to_db(data)
+        with metrics.stage("load"):
+            inserted, skipped = insert_jobs_to_db(data)
+        if inserted + skipped != len(data):
+            # Insert failed, keep the old watermark so the next run covers this window again
+            return
     else:
         print("No data to insert.")
 
+    if len(failed_pages):
+        # Keep the old watermark so the next run covers the pages that failed again
+        return
+    save_watermark(run_started_at)
+
+
+# Program checks for new listings every hour, paging until it reaches listings already stored
+def main():
+    try:
+        run_update()
+    finally:
+        # Emit stage timings and counters for this run
+        metrics.flush()
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,169 @@
+import os
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from common import metrics
+from extraction.api_extraction import (
+    MAX_CONCURRENT_REQUESTS, MAX_REQUESTS_PER_SECOND, REQUESTS_PER_SECOND, RESULTS_PER_PAGE,
+    deduplicate_jobs, extract_adzuna_data
+)
+from extraction.rate_limiter import AdaptiveTokenBucket
+
+
+# Adzuna country codes searched, comma separated in the environment, e.g. "gb,ie,de"
+ADZUNA_COUNTRIES = [country.strip() for country in os.getenv("ADZUNA_COUNTRIES", "gb").split(",") if country.strip()]
+
+# Role searches run in every country
+ROLE_QUERIES = [
+    'Data Engineer',
+    'Analytics Engineer',
+    'Machine Learning Engineer',
+    'MLOps Engineer',
+    'Data Platform Engineer',
+    'Big Data Engineer',
+    'Cloud Data Engineer',
+    'ETL Developer',
+]
+
+# Most pages fetched for a single search
+MAX_PAGES_PER_SEARCH = 10
+
+# One search: an Adzuna country code and a search term
+SearchJob = namedtuple('SearchJob', ['country', 'query'])
+
+
+def build_search_jobs(countries=ADZUNA_COUNTRIES, queries=ROLE_QUERIES):
+    """Return a SearchJob for every combination of country and query."""
+    return [SearchJob(country, query) for country in countries for query in queries]
+
+
+class RoundRobinScheduler:
+    """
+    Hands out (search, page) tasks one search at a time, in turn.
+
+    Every search gets its next page before any search gets another, so a query with many
+    pages cannot use up the shared rate budget while others wait. A search stops being
+    scheduled once it is finished, e.g. a page came back short, or reaches `max_pages`.
+
+    Parameters:
+    -----------
+    search_jobs : list of SearchJob
+        Searches to schedule
+
+    max_pages=MAX_PAGES_PER_SEARCH : int
+        Most pages scheduled for one search
+    """
+
+    def __init__(self, search_jobs, max_pages=MAX_PAGES_PER_SEARCH):
+        self.queue = deque(search_jobs)
+        self.next_page = {search: 1 for search in search_jobs}
+        self.finished = set()
+        self.max_pages = max_pages
+        self.lock = threading.Lock()
+
+    def next_task(self):
+        """Return the next (search, page_number) to fetch, or None once every search is done."""
+        with self.lock:
+            while self.queue:
+                search = self.queue.popleft()
+                if search in self.finished or self.next_page[search] > self.max_pages:
+                    continue
+                page_number = self.next_page[search]
+                self.next_page[search] += 1
+                # Back of the queue, behind every other search still running
+                self.queue.append(search)
+                return search, page_number
+            return None
+
+    def finish(self, search):
+        """Stop scheduling pages for a search."""
+        with self.lock:
+            self.finished.add(search)
+
+
+def extract_search_jobs(search_jobs, max_pages=MAX_PAGES_PER_SEARCH, max_days_old=None,
+                        max_workers=MAX_CONCURRENT_REQUESTS, rate_limiter=None, failed_pages=None):
+    """
+    Fetches listings for many (country, query) searches, sharing one rate budget between them.
+
+    Workers take pages from a round-robin scheduler and every request takes a token from
+    the same adaptive rate limiter, so all searches progress together within one API quota.
+    A search ends at its first short page. Listings found under several searches are kept once.
+
+    Parameters:
+    -----------
+    search_jobs : list of SearchJob
+        Searches to run, e.g. from `build_search_jobs`
+
+    max_pages=MAX_PAGES_PER_SEARCH : int
+        Most pages fetched for one search
+
+    max_days_old=None : int
+        Optional parameter to return the most recent jobs by age in days
+
+    max_workers=MAX_CONCURRENT_REQUESTS : int
+        Maximum number of requests in flight at once, across all searches
+
+    rate_limiter=None : AdaptiveTokenBucket
+        Shared limiter, defaults to a new adaptive bucket at REQUESTS_PER_SECOND
+
+    failed_pages=None : FailedPageLog
+        Optional record the pages that could not be fetched are added to
+
+    Returns:
+    --------
+    tuple
+        (unique clean job dictionaries, list of (job_id, country, query) provenance rows)
+    """
+    if rate_limiter is None:
+        rate_limiter = AdaptiveTokenBucket(REQUESTS_PER_SECOND, max_rate=MAX_REQUESTS_PER_SECOND)
+
+    scheduler = RoundRobinScheduler(search_jobs, max_pages)
+    pages = {}
+    pages_lock = threading.Lock()
+
+    def worker():
+        while True:
+            task = scheduler.next_task()
+            if task is None:
+                return
+            search, page_number = task
+
+            page = extract_adzuna_data(
+                page_number, max_days_old, rate_limiter, country=search.country, what=search.query
+            )
+            if page is None:
+                metrics.increment("api_pages_failed_total")
+                if failed_pages is not None:
+                    failed_pages.record(page_number, max_days_old=max_days_old, country=search.country, what=search.query)
+                continue
+
+            # A short page is the last page of results for this search
+            if len(page) < RESULTS_PER_PAGE:
+                scheduler.finish(search)
+            metrics.increment("search_pages_fetched_total", country=search.country)
+            with pages_lock:
+                pages[(search, page_number)] = page
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        workers = [executor.submit(worker) for _ in range(max_workers)]
+        # Re-raise anything a worker failed with instead of losing it in the pool
+        for future in workers:
+            future.result()
+
+    # Pages are combined in search then page order, so results do not depend on thread timing
+    search_order = {search: position for position, search in enumerate(search_jobs)}
+    ordered_pages = sorted(pages.items(), key=lambda item: (search_order[item[0][0]], item[0][1]))
+
+    all_jobs = [job for _, page in ordered_pages for job in page]
+    sources = list(dict.fromkeys(
+        (int(job['id']), search.country, search.query) for (search, _), page in ordered_pages for job in page
+    ))
+    unique_jobs = deduplicate_jobs(all_jobs)
+
+    metrics.increment("cross_search_duplicates_total", len(all_jobs) - len(unique_jobs))
+    metrics.set_gauge("api_request_rate_per_second", rate_limiter.rate)
+    print(f"Fetched {len(pages)} pages for {len(search_jobs)} searches: "
+          f"{len(all_jobs)} listings, {len(unique_jobs)} unique.")
+    return unique_jobs, sources
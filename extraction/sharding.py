@@ -0,0 +1,374 @@
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from common import metrics
+from extraction.api_extraction import (
+    MAX_CONCURRENT_REQUESTS, MAX_REQUESTS_PER_SECOND, REQUESTS_PER_SECOND, RESULTS_PER_PAGE,
+    clean_job_data, deduplicate_jobs, extract_adzuna_data, fetch_adzuna_geodata, fetch_adzuna_page
+)
+from extraction.rate_limiter import AdaptiveTokenBucket
+
+
+# Deepest page Adzuna serves for one search, so one search can return at most
+# MAX_PAGE_DEPTH * RESULTS_PER_PAGE listings however many match
+MAX_PAGE_DEPTH = int(os.getenv("ADZUNA_MAX_PAGE_DEPTH", 10))
+
+# Salary ranges are halved between 0 and the ceiling, listings above it form one open band
+SALARY_SPLIT_CEILING = 200000
+
+# Salary bands narrower than this are not split again
+MIN_SALARY_BAND_WIDTH = 1000
+
+# Most location levels a shard can be filtered by, location0 to location7
+MAX_LOCATION_DEPTH = 8
+
+# One slice of a search: the country and search term plus extra Adzuna filters,
+# e.g. {'location0': 'UK', 'location1': 'London', 'salary_min': 50000, 'salary_max': 75000}
+Shard = namedtuple('Shard', ['country', 'query', 'filters'])
+
+
+def shard_limit():
+    """Most listings one shard can return within the page depth limit."""
+    return MAX_PAGE_DEPTH * RESULTS_PER_PAGE
+
+
+def location_filters(area):
+    """Adzuna location filters for an area from the geodata endpoint, e.g. ['UK', 'London']."""
+    return {f'location{level}': name for level, name in enumerate(area)}
+
+
+def shard_area(shard):
+    """The area a shard's location filters select, e.g. ['UK', 'London']."""
+    return [shard.filters[f'location{level}'] for level in range(MAX_LOCATION_DEPTH) if f'location{level}' in shard.filters]
+
+
+def root_shard(search):
+    """Shard covering a whole (country, query) search, or the search itself if it is already a Shard."""
+    if isinstance(search, Shard):
+        return search
+    return Shard(search.country, search.query, {})
+
+
+def describe(shard):
+    """Short description of a shard for log messages."""
+    return f"{shard.country} '{shard.query}' {shard.filters}"
+
+
+def split_by_salary(shard):
+    """
+    Splits a shard's salary range in two, or returns an empty list if it is too narrow to split.
+
+    A shard without a salary filter is split at SALARY_SPLIT_CEILING into a closed and an open
+    band. Closed bands are halved, an open band is not split again. Bands do not overlap, so
+    the counts of the two halves add up to the count of the range. The lowest band also takes
+    the listings without a salary, so they are in exactly one shard.
+    """
+    low = shard.filters.get('salary_min', 0)
+    high = shard.filters.get('salary_max')
+
+    if high is None:
+        if 'salary_min' in shard.filters or low >= SALARY_SPLIT_CEILING:
+            return []
+        bounds = [(low, SALARY_SPLIT_CEILING), (SALARY_SPLIT_CEILING + 1, None)]
+    elif high - low < 2 * MIN_SALARY_BAND_WIDTH:
+        return []
+    else:
+        middle = (low + high) // 2
+        bounds = [(low, middle), (middle + 1, high)]
+
+    shards = []
+    for band_low, band_high in bounds:
+        filters = {
+            key: value for key, value in shard.filters.items()
+            if key not in ('salary_min', 'salary_max', 'salary_include_unknown')
+        }
+        if band_low:
+            filters['salary_min'] = band_low
+        else:
+            # Salary filters leave out listings without a salary unless asked to include them
+            filters['salary_include_unknown'] = 1
+        if band_high is not None:
+            filters['salary_max'] = band_high
+        shards.append(Shard(shard.country, shard.query, filters))
+    return shards
+
+
+def split_by_location(shard, max_days_old=None, rate_limiter=None):
+    """
+    Splits a shard into the sub-locations of its location, using the geodata endpoint.
+
+    Geodata areas list every level from the country down, e.g. ['UK', 'London'], so a shard
+    without location filters is treated as covering the country area its sub-locations share.
+    Listings known only at the shard's own location are in no sub-location, so the
+    sub-locations can hold fewer listings than the shard.
+
+    Returns:
+        tuple: (one Shard per sub-location with listings, number of listings they hold), with
+        no shards if the location has fewer than two sub-locations or the geodata request failed.
+    """
+    areas = fetch_adzuna_geodata(shard.country, shard.query, max_days_old, shard.filters, rate_limiter)
+    area_counts = {tuple(area): area_count for area, area_count in (areas or []) if area_count > 0 and area}
+
+    parent = shard_area(shard)
+    if not parent and area_counts and all(len(area) > 1 and area[0] == next(iter(area_counts))[0] for area in area_counts):
+        # The country is the implicit top level of a search without location filters
+        parent = [next(iter(area_counts))[0]]
+
+    shards, covered = [], 0
+    for area, area_count in area_counts.items():
+        # Only areas one level below the shard's location are a split of it
+        if len(area) != len(parent) + 1 or list(area[:len(parent)]) != parent:
+            continue
+        filters = {key: value for key, value in shard.filters.items() if not key.startswith('location')}
+        filters.update(location_filters(area))
+        shards.append(Shard(shard.country, shard.query, filters))
+        covered += area_count
+    if len(shards) < 2:
+        return [], 0
+    return shards, covered
+
+
+def split_shard(shard, count, max_days_old=None, rate_limiter=None):
+    """
+    Splits a shard with too many listings to page through into smaller shards.
+
+    Splits that keep every listing come first: sub-locations when they hold all of the
+    shard's listings, otherwise salary bands, which include listings without a salary.
+    Only once the salary band is too narrow to split, e.g. many listings at one round
+    salary, are sub-locations used even though they miss listings known only at the
+    shard's own location, as fetching the first pages of the shard would miss more.
+
+    Returns:
+        tuple: ('location' or 'salary', smaller shards covering the listings of `shard`),
+        with an empty list of shards if it cannot be split.
+    """
+    location_shards, covered = split_by_location(shard, max_days_old, rate_limiter)
+    if location_shards and covered >= count:
+        return 'location', location_shards
+
+    salary_shards = split_by_salary(shard)
+    if salary_shards:
+        return 'salary', salary_shards
+    return 'location', location_shards
+
+
+def plan_shards(search_jobs, max_days_old=None, max_workers=MAX_CONCURRENT_REQUESTS, rate_limiter=None):
+    """
+    Splits searches into shards that each fit within the page depth limit.
+
+    Every shard is probed with its first page, which gives the 'count' of listings matching
+    it. Shards over `shard_limit()` are split and the new shards probed in turn, one level at
+    a time, with every level's probes and geodata requests made concurrently. The first page
+    of each finished shard is kept, so it is not requested again.
+
+    The counts of a split shard's children are checked against its own count, and any gap,
+    e.g. from listings changing between requests, is logged and counted in shard_count_gap_total.
+
+    Parameters:
+    -----------
+    search_jobs : list of SearchJob or Shard
+        Searches to split, e.g. from `scheduler.build_search_jobs`, or shards to plan again
+
+    max_days_old=None : int
+        Optional parameter to return the most recent jobs by age in days
+
+    max_workers=MAX_CONCURRENT_REQUESTS : int
+        Maximum number of requests in flight at once
+
+    rate_limiter=None : AdaptiveTokenBucket
+        Shared limiter every request takes a token from
+
+    Returns:
+    --------
+    tuple
+        (list of (Shard, count, first page of clean jobs) for every shard to fetch,
+        list of shards whose probe failed, total listings reported for the searches)
+    """
+    # Each frontier entry is (shard, position in `splits` of the shard it was split from)
+    frontier = [(root_shard(search), None) for search in search_jobs]
+    splits = []
+    planned, failed = [], []
+    reported = 0
+
+    def probe(item):
+        shard = item[0]
+        response = fetch_adzuna_page(
+            1, max_days_old, rate_limiter, country=shard.country, what=shard.query, filters=shard.filters
+        )
+        if response is None:
+            return None
+        results = response.get('results', [])
+        metrics.increment("rows_fetched_total", len(results))
+        return int(response.get('count', 0)), [clean_job_data(job, shard.country) for job in results]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while frontier:
+            to_split = []
+            child_totals = {}
+            incomplete = set()
+            for (shard, parent), result in zip(frontier, executor.map(probe, frontier)):
+                metrics.increment("shard_probes_total")
+                if result is None:
+                    failed.append(shard)
+                    incomplete.add(parent)
+                    continue
+
+                count, first_page = result
+                if parent is None:
+                    reported += count
+                else:
+                    child_totals[parent] = child_totals.get(parent, 0) + count
+                if count > shard_limit():
+                    to_split.append((shard, count, first_page))
+                else:
+                    planned.append((shard, count, first_page))
+
+            # Listings of a split shard that no child shard matches are missed by the crawl
+            for parent, total in child_totals.items():
+                shard, count, reason = splits[parent]
+                if parent in incomplete or total >= count:
+                    continue
+                metrics.increment("shard_count_gap_total", count - total, split=reason)
+                print(f"Splitting {describe(shard)} by {reason} covers {total} of its {count} listings, "
+                      f"{count - total} match no {reason} shard and will not be fetched.")
+
+            frontier = []
+            results = executor.map(lambda item: split_shard(item[0], item[1], max_days_old, rate_limiter), to_split)
+            for (shard, count, first_page), (reason, children) in zip(to_split, results):
+                if children:
+                    splits.append((shard, count, reason))
+                    frontier.extend((child, len(splits) - 1) for child in children)
+                else:
+                    # Nothing left to split on, only the first MAX_PAGE_DEPTH pages can be fetched
+                    metrics.increment("shards_truncated_total")
+                    print(f"Shard {describe(shard)} has {count} listings "
+                          f"and cannot be split, fetching the first {shard_limit()}.")
+                    planned.append((shard, count, first_page))
+
+    metrics.set_gauge("shards_planned", len(planned))
+    return planned, failed, reported
+
+
+def crawl_query_space(search_jobs, max_days_old=None, max_workers=MAX_CONCURRENT_REQUESTS,
+                      rate_limiter=None, failed_pages=None):
+    """
+    Fetches every listing matching the searches, past the page depth limit of a single search.
+
+    Searches are split into shards by `plan_shards`, then the remaining pages of every shard
+    are fetched concurrently, sharing one adaptive rate limiter. Listings found under several
+    shards or searches are kept once.
+
+    Parameters:
+    -----------
+    search_jobs : list of SearchJob or Shard
+        (country, query) searches to crawl, or shards of them
+
+    max_days_old=None : int
+        Optional parameter to return the most recent jobs by age in days, applied to every shard
+
+    max_workers=MAX_CONCURRENT_REQUESTS : int
+        Maximum number of requests in flight at once
+
+    rate_limiter=None : AdaptiveTokenBucket
+        Shared limiter, defaults to a new adaptive bucket at REQUESTS_PER_SECOND
+
+    failed_pages=None : FailedPageLog
+        Optional record the pages that could not be fetched are added to, with their shard filters.
+        Shards whose count could not be fetched are recorded whole, so a retry plans them again.
+
+    Returns:
+    --------
+    tuple
+        (unique clean job dictionaries, list of (job_id, country, query) provenance rows)
+    """
+    if rate_limiter is None:
+        rate_limiter = AdaptiveTokenBucket(REQUESTS_PER_SECOND, max_rate=MAX_REQUESTS_PER_SECOND)
+
+    planned, failed_shards, reported = plan_shards(search_jobs, max_days_old, max_workers, rate_limiter)
+    for shard in failed_shards:
+        metrics.increment("shards_failed_total")
+        print(f"Shard {describe(shard)} could not be probed, none of its listings were fetched.")
+        if failed_pages is not None:
+            failed_pages.record_shard(
+                max_days_old=max_days_old, country=shard.country, query=shard.query, filters=shard.filters
+            )
+
+    # Pages 2 onwards of every shard, the first page came with the probe
+    tasks = [
+        (position, page_number)
+        for position, (_, count, _) in enumerate(planned)
+        for page_number in range(2, min(math.ceil(count / RESULTS_PER_PAGE), MAX_PAGE_DEPTH) + 1)
+    ]
+
+    def fetch_page(task):
+        position, page_number = task
+        shard = planned[position][0]
+        page = extract_adzuna_data(
+            page_number, max_days_old, rate_limiter, country=shard.country, what=shard.query, filters=shard.filters
+        )
+        if page is None:
+            metrics.increment("api_pages_failed_total")
+            if failed_pages is not None:
+                failed_pages.record(
+                    page_number, max_days_old=max_days_old, country=shard.country, what=shard.query, filters=shard.filters
+                )
+            return []
+        return page
+
+    # executor.map keeps task order, so results do not depend on thread timing
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = list(executor.map(fetch_page, tasks))
+
+    shard_pages = [(shard, first_page) for shard, _, first_page in planned]
+    shard_pages += [(planned[position][0], page) for (position, _), page in zip(tasks, pages)]
+
+    all_jobs = [job for _, page in shard_pages for job in page]
+    sources = list(dict.fromkeys(
+        (int(job['id']), shard.country, shard.query) for shard, page in shard_pages for job in page
+    ))
+    unique_jobs = deduplicate_jobs(all_jobs)
+
+    metrics.increment("cross_search_duplicates_total", len(all_jobs) - len(unique_jobs))
+    metrics.set_gauge("api_request_rate_per_second", rate_limiter.rate)
+    if reported:
+        metrics.set_gauge("crawl_coverage_ratio", len(sources) / reported)
+    print(f"Crawled {len(planned)} shards in {len(tasks) + len(planned)} pages for {len(search_jobs)} searches: "
+          f"{len(unique_jobs)} unique listings of {reported} reported.")
+    if len(sources) < reported:
+        print(f"Warning: {reported - len(sources)} reported listings were not fetched, "
+              f"see the count gap, truncated shard and failed page messages above.")
+    return unique_jobs, sources
+
+
+def retry_failed_shards(entries, max_workers=MAX_CONCURRENT_REQUESTS, rate_limiter=None, failed_pages=None):
+    """
+    Plans and crawls again the shards an earlier crawl could not probe.
+
+    Parameters:
+    -----------
+    entries : list of dict
+        Failed shard entries from a FailedPageLog record, see `FailedPageLog.record_shard`
+
+    failed_pages=None : FailedPageLog
+        Record the shards and pages that fail again are added to
+
+    Returns:
+    --------
+    tuple
+        (unique clean job dictionaries, list of (job_id, country, query) provenance rows)
+    """
+    # Shards are crawled together for each max_days_old they were requested with
+    shards_by_age = {}
+    for entry in entries:
+        params = entry['shard']
+        shard = Shard(params['country'], params['query'], params.get('filters') or {})
+        shards_by_age.setdefault(params.get('max_days_old'), []).append(shard)
+
+    jobs, sources = [], []
+    for max_days_old, shards in shards_by_age.items():
+        shard_jobs, shard_sources = crawl_query_space(shards, max_days_old, max_workers, rate_limiter, failed_pages)
+        jobs.extend(shard_jobs)
+        sources.extend(shard_sources)
+    return deduplicate_jobs(jobs), list(dict.fromkeys(sources))